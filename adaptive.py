@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+'''
+Adaptive refinement of the datasize grid of a sweep.
+
+Starting from a coarse grid, intervals between neighboring datasizes are
+bisected as long as some metric changes by more than a relative tolerance
+between the endpoints, or the parameters the scheme picks change (e.g.,
+the number of FRI rounds). Bisection stops at the given resolution, so
+step discontinuities are located exactly, or when the point budget is
+exhausted. Changes that are reverted within an interval of the current
+grid are not detected.
+'''
+
+from functools import partial
+
+import math
+
+from schemes import *
+from fri import *
+from sweep import *
+
+
+def _friSignature(datasize, invrate=4, fsize=128, verbose=False,
+                  maxbatchsize=FRI_MAX_BATCHSIZE, batchsize=None,
+                  fanin=None, basedimension=None):
+    return friSchemeParameters(datasize, invrate, fsize, maxbatchsize,
+                               batchsize, fanin, basedimension)
+
+
+# scheme name -> function mapping (datasize, **params) to the parameters
+# the scheme picks internally. A change of these parameters between two
+# datasizes always triggers a refinement. Schemes without a signature
+# (e.g., tensor, whose dimension changes every few hundred bits) are
+# only refined based on the tolerance.
+SIGNATURES = {
+    "fri": _friSignature,
+}
+
+
+def _evaluateSigned(signature, items):
+    '''
+    Evaluate a chunk of (point, metrics) pairs, where metrics is None if
+    the point is not in the store, and return (metrics, error, signature)
+    per pair. The signature is computed in the same worker as the metrics,
+    so it reuses the caches filled by the evaluation of the point.
+    '''
+    outcomes = []
+    for point, metrics in items:
+        error = None
+        if metrics is None:
+            (metrics, error) = evaluatePoint(point)
+        sig = None
+        if metrics is not None and signature is not None:
+            sig = signature(point.datasize, **point.kwargs())
+        outcomes.append((metrics, error, sig))
+    return outcomes
+
+
+def _relativeChange(x, y):
+    scale = max(abs(x), abs(y))
+    return abs(x - y) / scale if scale > 0 else 0.0
+
+
+def _score(a, b, tolerance):
+    '''
+    Returns how much the interval between the evaluated points a and b,
+    given as (metrics, signature), needs refinement (0 if it does not)
+    '''
+    (ma, sa) = a
+    (mb, sb) = b
+    if ma is None or mb is None:
+        # refine around failing points to locate where they start
+        return 0.0 if ma is None and mb is None else math.inf
+    if sa != sb:
+        return math.inf
+    change = max(_relativeChange(x, y) for x, y in zip(ma, mb))
+    return change if change > tolerance else 0.0
+
+
+def refineGrid(scheme, lo, hi, params=None, tolerance=0.05, budget=200,
+               resolution=1, initial=11, signature=None,
+               workers=1, backend="process", store=None):
+    '''
+    Adaptively sample the datasizes (in bits) in [lo, hi] for the scheme
+    with the given name in SCHEMES and keyword parameters params.
+    Starts with initial evenly spaced datasizes, and evaluates at most
+    budget datasizes in total. Datasizes are multiples of resolution
+    (plus lo). signature defaults to SIGNATURES[scheme], if present, and
+    is computed by the workers together with the metrics (so it has to be
+    picklable for backend="process").
+    Returns a SweepResult with the evaluated points sorted by datasize.
+    '''
+    assert lo < hi and resolution >= 1 and initial >= 2
+    params = params or {}
+    if signature is None:
+        signature = SIGNATURES.get(scheme)
+
+    evaluated = {}  # datasize -> (metrics, signature)
+    result = SweepResult(points=[], metrics=[], errors=[])
+
+    def evaluate(datasizes):
+        points = [makePoint(scheme, d, **params) for d in datasizes]
+        cached = store.lookup(points) if store is not None else [None] * len(points)
+        outcomes = mapChunks(partial(_evaluateSigned, signature),
+                             list(zip(points, cached)), workers, backend)
+        if store is not None:
+            store.save((p, metrics) for p, m, (metrics, error, _)
+                       in zip(points, cached, outcomes) if m is None and error is None)
+        for point, (metrics, error, sig) in zip(points, outcomes):
+            if error is not None:
+                result.errors.append(SweepError(point, error[0], error[1]))
+            evaluated[point.datasize] = (metrics, sig)
+
+    steps = (hi - lo) // resolution
+    grid = {lo + ((steps * i) // (initial - 1)) * resolution
+            for i in range(initial)}
+    evaluate(sorted(grid | {hi})[:budget])
+
+    while len(evaluated) < budget:
+        xs = sorted(evaluated)
+        candidates = []
+        for a, b in zip(xs, xs[1:]):
+            if b - a <= resolution:
+                continue
+            score = _score(evaluated[a], evaluated[b], tolerance)
+            if score > 0:
+                mid = a + ((b - a) // (2 * resolution)) * resolution
+                candidates.append((score, mid))
+        if len(candidates) == 0:
+            break
+        candidates.sort(key=lambda c: -c[0])
+        evaluate([mid for (_, mid) in candidates[:budget - len(evaluated)]])
+
+    for d in sorted(evaluated):
+        result.points.append(makePoint(scheme, d, **params))
+        result.metrics.append(evaluated[d][0])
+    return result
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+'''
+Benchmarks of the cost model, the optimizers, and the command line
+entry points, to notice performance regressions.
+
+Every benchmark is a function that runs one scenario and returns the
+number of evaluations it did (e.g., the number of schemes it computed).
+It is run a number of times for warmup and then a number of times that
+are measured. All caches of memo.py are cleared before every run, so
+the numbers are for cold runs.
+
+The results (median, p95, evaluations per second) can be saved as json
+and compared against a baseline saved before: a benchmark regresses if
+its median is more than the threshold (relative) above the baseline.
+
+Usage: python3 bench.py [-h] [--repeat N] [--warmup N] [--save PATH]
+                        [--baseline PATH] [--threshold T] [names ...]
+'''
+
+from dataclasses import dataclass
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from memo import clearCaches
+from fri import *
+from sweep import *
+
+# 128 KiB blobs as in Ethereum (EIP-4844)
+BLOB_SIZE = 128 * 1024 * 8
+MB = 8000000
+
+# directory of the scripts, for the command line benchmarks
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Benchmark:
+    name: str
+    description: str
+    run: object       # function without arguments returning the number of evaluations
+    repeat: int = 5   # default number of measured runs
+    requires: tuple = ()  # optional modules the benchmark needs
+
+    def missing(self):
+        '''
+        Names of the modules in requires that are not installed
+        '''
+        return [m for m in self.requires if importlib.util.find_spec(m) is None]
+
+
+# name -> Benchmark, in the order in which they are run
+BENCHMARKS = {}
+
+
+def benchmark(name, description, repeat=5, requires=()):
+    '''
+    Decorator registering a function as a benchmark
+    '''
+    def register(run):
+        BENCHMARKS[name] = Benchmark(name, description, run, repeat, requires)
+        return run
+    return register
+
+
+@benchmark("fri_blobs", "makeFRIScheme for 1, ..., 256 blobs of 128 KiB")
+def _friBlobs():
+    for b in range(1, 257):
+        makeFRIScheme(b * BLOB_SIZE)
+    return 256
+
+
+@benchmark("fri_parameters", "friGoodParameters for 1, ..., 155 MB")
+def _friParameters():
+    for s in range(1, 156):
+        friGoodParameters(math.ceil(s * MB / 128), 128, 4)
+    return 155
+
+
+@benchmark("tensor_code", "Code.tensor of the tensor scheme for 1, ..., 155 MB")
+def _tensorCode():
+    for s in range(1, 156):
+        m = math.ceil(s * MB / BLS_FE_SIZE)
+        k = math.ceil(math.sqrt(m))
+        rs = makeRSCode(BLS_FE_SIZE, k, 2 * k)
+        rs.tensor(rs)
+    return 155
+
+
+@benchmark("sweep_1_155", "all schemes for every data size of 1, ..., 155 MB")
+def _sweep():
+    points = [makePoint(name, s * MB) for name in SCHEMES for s in range(1, 156)]
+    result = runSweep(points)
+    assert not result.errors
+    return len(points)
+
+
+@benchmark("large_1gb", "all schemes for 1, 2, 4 and 8 GB", repeat=3)
+def _large():
+    points = [makePoint(name, s * 1000 * MB) for name in SCHEMES for s in [1, 2, 4, 8]]
+    result = runSweep(points)
+    assert not result.errors
+    return len(points)
+
+
+@benchmark("vectorized_1_155", "makeFRISchemeArray for every data size of 1, ..., 155 MB")
+def _vectorized():
+    import numpy as np
+    from vectorized import makeFRISchemeArray
+    datasizes = np.arange(1, 156) * MB
+    makeFRISchemeArray(datasizes).total_comm()
+    return len(datasizes)
+
+
+def _script(*args):
+    '''
+    Run a script of this repository in a temporary directory
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, args[0])] + list(args[1:]),
+                       cwd=directory, check=True, stdout=subprocess.DEVNULL)
+
+
+@benchmark("table_cli", "python3 table.py 32", repeat=3, requires=("tabulate",))
+def _table():
+    _script("table.py", "32")
+    return len(SCHEMES)
+
+
+@benchmark("graphs_cli", "python3 graphs.py", repeat=3)
+def _graphs():
+    _script("graphs.py")
+    return 1
+
+
+def percentile(values, p):
+    '''
+    p-th percentile (nearest rank) of a list of values
+    '''
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def runBenchmark(bench, repeat=None, warmup=1):
+    '''
+    Run a benchmark and return a dict with its statistics
+    '''
+    repeat = repeat or bench.repeat
+    for _ in range(warmup):
+        clearCaches()
+        bench.run()
+    times = []
+    for _ in range(repeat):
+        clearCaches()
+        start = time.perf_counter()
+        evaluations = bench.run()
+        times.append(time.perf_counter() - start)
+    median = percentile(times, 50)
+    return {
+        "description": bench.description,
+        "repeat": repeat,
+        "evaluations": evaluations,
+        "min": min(times),
+        "median": median,
+        "p95": percentile(times, 95),
+        "evals_per_sec": evaluations / median if median > 0 else math.inf,
+    }
+
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "python": platform.python_version(),
+        "numpy": numpy_version,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    '''
+    Returns a list of (name, ratio of the medians, regressed)
+    for all benchmarks in both results and baseline
+    '''
+    comparison = []
+    for name, r in results.items():
+        if name in baseline:
+            ratio = r["median"] / baseline[name]["median"]
+            comparison.append((name, ratio, ratio > 1 + threshold))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmarks.")
+    parser.add_argument("names", nargs="*",
+                        help="benchmarks to run (default: all of " + ", ".join(BENCHMARKS) + ")")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="number of measured runs (default: per benchmark)")
+    parser.add_argument("--warmup", type=int, default=1, help="number of warmup runs")
+    parser.add_argument("--save", help="write the results as json to this path")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown of the median that counts as a regression")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark " + name)
+
+    results = {}
+    print("{:<18} {:>10} {:>10} {:>14}".format("benchmark", "median [s]", "p95 [s]", "evals/s"))
+    for name in args.names or BENCHMARKS:
+        missing = BENCHMARKS[name].missing()
+        if missing:
+            print("{:<18} skipped, requires {}".format(name, ", ".join(missing)))
+            continue
+        r = runBenchmark(BENCHMARKS[name], args.repeat, args.warmup)
+        results[name] = r
+        print("{:<18} {:>10.4f} {:>10.4f} {:>14.1f}".format(
+            name, r["median"], r["p95"], r["evals_per_sec"]))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = 0
+        print("\n{:<18} {:>10}".format("benchmark", "vs. baseline"))
+        for (name, ratio, regressed) in compare(results, baseline, args.threshold):
+            print("{:<18} {:>9.2f}x{}".format(name, ratio, "  REGRESSION" if regressed else ""))
+            regressions += regressed
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
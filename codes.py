@@ -1,7 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 import math
 
+from memo import memoize
+
 # Statistical Security Parameter for Soundness
 SECPAR_SOUND = 40
 
@@ -15,6 +17,9 @@ class Code:
     # number of symbols needed to reconstruct (worst case)
     reception: int
     samples: int          # number of random samples to reconstruct with high probability
+    # (row, column) code if this is a tensor code, the d codes if this is
+    # a d-dimensional tensor code (see makeTensorCode), () otherwise
+    factors: tuple = ()
 
     def interleave(self, ell):
         return Code(
@@ -23,7 +28,8 @@ class Code:
             msg_len=self.msg_len,
             codeword_len=self.codeword_len,
             reception=self.reception,
-            samples=self.samples
+            samples=self.samples,
+            factors=self.factors
         )
 
     def tensor(self, col):
@@ -86,25 +92,8 @@ class Code:
 
         Concretely, Option 2/3 will be tighter, especially for large k
         '''
-        samples_via_reception = samples_from_reception(
-            SECPAR_SOUND, reception, codeword_len)
-
-        loge = math.log2(math.e)
-        lognc = math.log2(col.codeword_len)
-        lognr = math.log2(self.codeword_len)
-        logbinomr = (self.reception - 1) * \
-            (lognr + loge - math.log2(self.reception - 1))
-        loginnerr = math.log2(
-            1.0 - (self.codeword_len - self.reception + 1)/codeword_len)
-        logbinomc = (col.reception - 1) * \
-            (lognc + loge - math.log2(col.reception - 1))
-        loginnerc = math.log2(
-            1.0 - (col.codeword_len - col.reception + 1)/codeword_len)
-
-        samples_direct_via_rows = int(
-            math.ceil(-(lognc + logbinomr + SECPAR_SOUND)/loginnerr))
-        samples_direct_via_cols = int(
-            math.ceil(-(lognr + logbinomc + SECPAR_SOUND)/loginnerc))
+        (samples_via_reception, samples_direct_via_rows,
+         samples_direct_via_cols) = tensor_sample_bounds(self, col)
 
         samples_direct = min(samples_direct_via_rows, samples_direct_via_cols)
         samples = min(samples_direct, samples_via_reception)
@@ -115,9 +104,23 @@ class Code:
             size_code_symbol=self.size_code_symbol,
             codeword_len=codeword_len,
             reception=reception,
-            samples=samples
+            samples=samples,
+            factors=(self, col)
         )
 
+    def with_exact_samples(self):
+        '''
+        Returns a copy of this code where the number of samples is computed
+        exactly (see exact.py) instead of via the generalized coupon collector.
+        Tensor codes are returned unchanged, as any reception many symbols
+        are not enough for them.
+        '''
+        if len(self.factors) != 0:
+            return self
+        from exact import samples_exact
+        return replace(self, samples=samples_exact(
+            SECPAR_SOUND, self.reception, self.codeword_len))
+
     def __eq__(self, other):
         return (
             self.size_msg_symbol == other.size_msg_symbol
@@ -134,6 +137,7 @@ class Code:
         )
 
 
+@memoize
 def samples_from_reception(sec_par, reception, codeword_len):
     '''
     Compute the number of samples needed to reconstruct
@@ -158,6 +162,108 @@ def samples_from_reception(sec_par, reception, codeword_len):
     return int(s)
 
 
+def tensor_sample_bounds(row, col):
+    '''
+    Compute the three bounds on the number of samples for the tensor
+    code row.tensor(col), see the comment in Code.tensor. Returns the triple
+    (samples_via_reception, samples_direct_via_rows, samples_direct_via_cols)
+    '''
+    row_dist = row.codeword_len - row.reception + 1
+    col_dist = col.codeword_len - col.reception + 1
+    codeword_len = row.codeword_len * col.codeword_len
+    reception = codeword_len - row_dist * col_dist + 1
+
+    samples_via_reception = samples_from_reception(
+        SECPAR_SOUND, reception, codeword_len)
+
+    loge = math.log2(math.e)
+    lognc = math.log2(col.codeword_len)
+    lognr = math.log2(row.codeword_len)
+    logbinomr = (row.reception - 1) * \
+        (lognr + loge - math.log2(row.reception - 1))
+    loginnerr = math.log2(
+        1.0 - (row.codeword_len - row.reception + 1)/codeword_len)
+    logbinomc = (col.reception - 1) * \
+        (lognc + loge - math.log2(col.reception - 1))
+    loginnerc = math.log2(
+        1.0 - (col.codeword_len - col.reception + 1)/codeword_len)
+
+    samples_direct_via_rows = int(
+        math.ceil(-(lognc + logbinomr + SECPAR_SOUND)/loginnerr))
+    samples_direct_via_cols = int(
+        math.ceil(-(lognr + logbinomc + SECPAR_SOUND)/loginnerc))
+
+    return (samples_via_reception, samples_direct_via_rows,
+            samples_direct_via_cols)
+
+
+def tensor_product_sample_bounds(codes):
+    '''
+    Generalization of tensor_sample_bounds to the d-dimensional tensor code
+    makeTensorCode(codes). Returns (samples_via_reception, samples_direct),
+    where samples_direct[j] is the bound via the lines along dimension j:
+    if every such line has at least reception_j samples, all of them can be
+    decoded, which reconstructs the data. So by the union bound over the
+    N / n_j lines and the (n_j choose t_j - 1) sets of positions in a line,
+    reconstruction fails with probability at most
+    N / n_j * (n_j choose t_j - 1) * (1 - (n_j - t_j + 1) / N)^{number of samples}.
+    For d = 2, these are the bounds of tensor_sample_bounds.
+    '''
+    lens = [c.codeword_len for c in codes]
+    dist = math.prod(c.codeword_len - c.reception + 1 for c in codes)
+    codeword_len = math.prod(lens)
+    reception = codeword_len - dist + 1
+
+    samples_via_reception = samples_from_reception(
+        SECPAR_SOUND, reception, codeword_len)
+
+    loge = math.log2(math.e)
+    lognj = [math.log2(n) for n in lens]
+    samples_direct = []
+    for j, code in enumerate(codes):
+        # number of lines along dimension j
+        loglines = sum(lognj[i] for i in range(len(codes)) if i != j)
+        logbinom = (code.reception - 1) * \
+            (lognj[j] + loge - math.log2(code.reception - 1))
+        loginner = math.log2(
+            1.0 - (code.codeword_len - code.reception + 1)/codeword_len)
+        samples_direct.append(int(
+            math.ceil(-(loglines + logbinom + SECPAR_SOUND)/loginner)))
+
+    return (samples_via_reception, samples_direct)
+
+
+def makeTensorCode(codes):
+    '''
+    d-dimensional tensor product of the given codes (d = len(codes) >= 2),
+    where the data is a k_1 x ... x k_d array and the codeword is a
+    n_1 x ... x n_d array. For two codes, this is codes[0].tensor(codes[1]).
+    As in Code.tensor, the worst case reception is the codeword length
+    minus the distance (the product of the distances) plus one, and the
+    number of samples is the minimum of the bounds of
+    tensor_product_sample_bounds.
+    '''
+    assert len(codes) >= 2
+    for code in codes:
+        assert code.size_msg_symbol == codes[0].size_msg_symbol
+        assert code.size_code_symbol == codes[0].size_code_symbol
+        assert code.size_msg_symbol == code.size_code_symbol
+
+    codeword_len = math.prod(c.codeword_len for c in codes)
+    dist = math.prod(c.codeword_len - c.reception + 1 for c in codes)
+    (samples_via_reception, samples_direct) = tensor_product_sample_bounds(codes)
+
+    return Code(
+        size_msg_symbol=codes[0].size_msg_symbol,
+        msg_len=math.prod(c.msg_len for c in codes),
+        size_code_symbol=codes[0].size_code_symbol,
+        codeword_len=codeword_len,
+        reception=codeword_len - dist + 1,
+        samples=min(min(samples_direct), samples_via_reception),
+        factors=tuple(codes)
+    )
+
+
 def makeTrivialCode(symbolsize, msg_len):
     '''
     Identity Code, mapping a message of msg_len many symbos to itself.
@@ -194,3 +300,4 @@ def makeRSCode(fsize, k, n):
 # tests
 assert makeRSCode(5, 2, 4).tensor(makeRSCode(5, 2, 4)).reception == 8
 assert makeRSCode(5, 2, 4).reception == 2
+assert makeTensorCode([makeRSCode(5, 2, 4)] * 3).reception == 64 - 27 + 1
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+'''
+Columnar output of sweeps: one NumPy array (.npy) per metric.
+
+ColumnWriter writes (point, metrics) pairs into a directory, grouped by
+scheme and keyword parameters. Every group gets one array of data sizes
+and one array per metric of METRICS, each in its own .npy file, and
+every call of write appends to these files, so sweeps of any length can
+be written batch by batch (it is a sink for runPipeline in sweep.py).
+The .npy headers have a fixed size and are completed when the writer is
+closed, together with a JSON manifest (manifest.json) that lists the
+groups, their files, and the units of the metrics. Metrics that count
+symbols or samples are stored as int64, all others as float64.
+
+loadColumns opens the arrays with numpy.load(mmap_mode='r'), so loading
+does not copy or even read the data until it is used.
+
+Usage: python3 columnar.py <directory>   (prints a summary of the groups)
+'''
+
+from dataclasses import dataclass
+
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from sweep import *
+
+MANIFEST = "manifest.json"
+
+# unit of the data size and of every metric of METRICS
+UNITS = {
+    "datasize": "bit",
+    "com_size": "bit",
+    "comm_per_query": "bit",
+    "total_comm": "bit",
+    "encoding_size": "bit",
+    "reception": "symbols",
+    "samples": "samples",
+    "encoding_length": "symbols",
+    "prover_time": "s",
+    "verifier_time": "s",
+    "decoder_time": "s",
+    "total_comm_multiproof": "bit",
+}
+
+
+@dataclass
+class ColumnGroup:
+    scheme: str     # name of the scheme in SCHEMES
+    params: dict    # keyword parameters of the scheme
+    datasize: object  # array of the data sizes in bits
+    columns: dict   # name of the metric -> array with one entry per data size
+
+    def __len__(self):
+        return len(self.datasize)
+
+    def rows(self, blocksize=65536):
+        '''
+        Iterate over (datasize, tuple of METRICS) as in a SweepResult,
+        converting blocksize entries at a time to Python numbers
+        '''
+        for i in range(0, len(self), blocksize):
+            columns = [self.columns[m][i:i + blocksize].tolist() for m in METRICS]
+            yield from zip(self.datasize[i:i + blocksize].tolist(), zip(*columns))
+
+
+# metrics stored as int64 (all others are stored as float64)
+INT_COLUMNS = ("datasize", "reception", "samples", "encoding_length")
+
+# size of the header of the .npy files, which leaves room for any shape
+HEADER_SIZE = 128
+
+
+def _header(dtype, count):
+    '''
+    Header of a .npy file (format version 1.0) of
+    a one-dimensional array, padded to HEADER_SIZE
+    '''
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}".format(
+        np.dtype(dtype).str, count)
+    header = header.ljust(HEADER_SIZE - len(np.lib.format.MAGIC_PREFIX) - 4) + "\n"
+    return np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + \
+        struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class ColumnWriter:
+    '''
+    Sink writing (point, metrics) pairs into a directory (see above)
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.groups = {}  # (scheme, params) -> manifest entry of the group
+        os.makedirs(directory, exist_ok=True)
+
+    def _group(self, scheme, params):
+        key = (scheme, params)
+        if key not in self.groups:
+            prefix = "{}_{}".format(scheme, len(self.groups))
+            files = {name: prefix + "_" + name + ".npy"
+                     for name in ("datasize",) + tuple(METRICS)}
+            for name, path in files.items():
+                with open(os.path.join(self.directory, path), "wb") as f:
+                    f.write(_header(self._dtype(name), 0))
+            self.groups[key] = {"scheme": scheme, "params": dict(params),
+                                "count": 0, "files": files}
+        return self.groups[key]
+
+    @staticmethod
+    def _dtype(name):
+        return np.int64 if name in INT_COLUMNS else np.float64
+
+    def write(self, pairs):
+        '''
+        Append the (point, metrics) pairs to the arrays of their groups
+        '''
+        batches = {}
+        for point, metrics in pairs:
+            batches.setdefault((point.scheme, point.params), []).append(
+                (point.datasize,) + tuple(metrics))
+        for (scheme, params), rows in batches.items():
+            group = self._group(scheme, params)
+            names = ("datasize",) + tuple(METRICS)
+            for name, column in zip(names, zip(*rows)):
+                with open(os.path.join(self.directory, group["files"][name]), "ab") as f:
+                    np.asarray(column, dtype=self._dtype(name)).tofile(f)
+            group["count"] += len(rows)
+
+    def close(self):
+        '''
+        Complete the headers and write the manifest
+        '''
+        for group in self.groups.values():
+            for name, path in group["files"].items():
+                with open(os.path.join(self.directory, path), "r+b") as f:
+                    f.write(_header(self._dtype(name), group["count"]))
+        manifest = {"metrics": list(METRICS), "units": UNITS,
+                    "groups": list(self.groups.values())}
+        with open(os.path.join(self.directory, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def writeColumns(directory, result):
+    '''
+    Write the successful points of a SweepResult into directory
+    '''
+    writer = ColumnWriter(directory)
+    writer.write(result)
+    writer.close()
+
+
+def loadColumns(directory):
+    '''
+    List of the ColumnGroups in directory, with memory-mapped arrays
+    '''
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    groups = []
+    for group in manifest["groups"]:
+        arrays = {name: np.load(os.path.join(directory, path), mmap_mode="r")
+                  for name, path in group["files"].items()}
+        datasize = arrays.pop("datasize")
+        groups.append(ColumnGroup(group["scheme"], group["params"], datasize, arrays))
+    return groups
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 columnar.py <directory>")
+        sys.exit(-1)
+    for group in loadColumns(sys.argv[1]):
+        print("{} {}: {} points, data sizes {} to {} bits".format(
+            group.scheme, group.params, len(group),
+            group.datasize[0], group.datasize[-1]))
+
+
+if __name__ == "__main__":
+    main()
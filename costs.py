@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+'''
+Computational cost model.
+
+The cost of an operation of a scheme (e.g., proving, verifying one
+sample, reconstructing) is given by operation counts (OpCounts), and
+the time it takes is the sum of the counts weighted by the time per
+operation on some machine (MachineProfile). Counts are estimates based
+on standard algorithms (NTTs for encoding, Pippenger for MSMs, SHA-256
+for hashing), and are meant to compare schemes, not to predict running
+times precisely.
+
+The default profile can be replaced by a json file whose path is given
+in the environment variable DAS_PROFILE, e.g., {"gexp": 5e-5}.
+'''
+
+from dataclasses import dataclass, field, fields
+
+import json
+import math
+import os
+
+
+@dataclass
+class OpCounts:
+    fmul: float = 0       # multiplications of 64-bit words modulo a prime
+    hashbytes: float = 0  # bytes hashed with SHA-256
+    gexp: float = 0       # exponentiations (scalar multiplications) in a group
+    pairings: float = 0   # pairings
+
+    def __add__(self, other):
+        return OpCounts(*(getattr(self, f.name) + getattr(other, f.name)
+                          for f in fields(self)))
+
+    def __mul__(self, factor):
+        return OpCounts(*(getattr(self, f.name) * factor for f in fields(self)))
+
+    __rmul__ = __mul__
+
+
+@dataclass
+class MachineProfile:
+    '''
+    Time in seconds per operation of OpCounts
+    (default: rough single core numbers)
+    '''
+    fmul: float = 2e-9        # e.g., Goldilocks multiplication
+    hashbytes: float = 2.5e-9  # SHA-256 at 400 MB/s
+    gexp: float = 1e-4        # e.g., scalar multiplication in BLS12-381 G1
+    pairings: float = 1e-3    # BLS12-381 pairing
+
+    def time(self, counts):
+        return sum(getattr(counts, f.name) * getattr(self, f.name)
+                   for f in fields(self))
+
+
+@dataclass
+class SchemeCosts:
+    prover: OpCounts = field(default_factory=OpCounts)    # encode, commit, open all
+    verifier: OpCounts = field(default_factory=OpCounts)  # verify one sample
+    decoder: OpCounts = field(default_factory=OpCounts)   # reconstruct the data
+
+
+def loadProfile(path):
+    '''
+    MachineProfile with the defaults overridden by a json file
+    '''
+    with open(path) as f:
+        return MachineProfile(**json.load(f))
+
+
+DEFAULT_PROFILE = loadProfile(os.environ["DAS_PROFILE"]) \
+    if "DAS_PROFILE" in os.environ else MachineProfile()
+
+
+def fieldMults(fsize):
+    '''
+    Number of 64-bit word multiplications for
+    one multiplication of elements of size fsize
+    '''
+    return math.ceil(fsize / 64) ** 2
+
+
+def nttCounts(size, fsize):
+    '''
+    Radix-2 NTT with size evaluation points
+    '''
+    size = 2 ** math.ceil(math.log2(max(2, size)))
+    return OpCounts(fmul=size / 2 * math.log2(size) * fieldMults(fsize))
+
+
+def decodeCounts(k, fsize):
+    '''
+    Erasure decoding of a Reed-Solomon code of dimension k
+    via fast interpolation, with O(k log^2 k) multiplications
+    '''
+    k = max(2, k)
+    return OpCounts(fmul=k * math.log2(k) ** 2 * fieldMults(fsize))
+
+
+def msmCounts(m):
+    '''
+    Multi-scalar multiplication of size m with Pippenger's algorithm,
+    in units of single exponentiations
+    '''
+    return OpCounts(gexp=m / math.log2(m) if m > 2 else m)
+
+
+def kzgAllProofsCounts(k, n):
+    '''
+    Computing KZG opening proofs for all n evaluations of a polynomial of
+    degree < k with the FK20 algorithm, i.e., group FFTs of size 2k and n
+    '''
+    return OpCounts(gexp=2 * k * math.log2(max(2, 2 * k)) + n / 2 * math.log2(max(2, n)))
+
+
+def kzgVerifyCounts():
+    '''
+    Verifying one KZG opening proof (one pairing equation)
+    '''
+    return OpCounts(gexp=2, pairings=2)
+
+
+def merkleTreeCounts(numleafs, leafsize):
+    '''
+    Hashing numleafs leaves of leafsize bits and the inner nodes
+    '''
+    return OpCounts(hashbytes=numleafs * (leafsize / 8 + 64))
+
+
+def merklePathCounts(numleafs, leafsize):
+    '''
+    Verifying a Merkle path for a leaf of leafsize bits
+    '''
+    return OpCounts(hashbytes=leafsize / 8 + math.ceil(math.log2(max(2, numleafs))) * 64)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+'''
+Exact number of samples for codes where any reception many distinct
+symbols suffice to reconstruct (e.g., Reed-Solomon codes, interleaved
+Reed-Solomon codes, and the trivial code).
+
+samples_from_reception bounds the number of samples with a generalized
+coupon collector argument. Here, we compute the probability that fewer
+than reception distinct positions have been sampled after s samples via
+a dynamic program over the number of distinct positions (a Markov chain
+that stays in state j with probability j/n and moves to j+1 otherwise),
+and return the smallest s for which it is at most 2^{-sec_par}.
+
+The distribution is kept as a vector of probabilities relative to a
+scale factor stored in log space, restricted to the window of states
+that are not negligible, so that every step is a few vectorized
+operations on that window. Negligible states (below 2^{-sec_par-DROP_BITS})
+are dropped, which changes the failure probability by a relative error
+far below 2^{-DROP_BITS/2}.
+'''
+
+import math
+import numpy as np
+
+from codes import *
+from memo import memoize
+
+# states with probability below 2^{-sec_par-DROP_BITS} are dropped
+DROP_BITS = 64
+
+# number of steps between two checks of the failure probability
+BLOCK = 64
+
+
+class _Chain:
+    '''
+    Distribution of the number of distinct sampled positions (if it is
+    below reception) after some number of samples
+    '''
+
+    def __init__(self, reception, codeword_len, cutoff):
+        j = np.arange(reception, dtype=np.float64)
+        self.stay = j / codeword_len
+        self.move = (codeword_len - j) / codeword_len
+        self.cutoff = cutoff
+        # p[lo:hi] are the probabilities of the states lo, ..., hi-1
+        # relative to exp(logscale). States >= reception are not kept.
+        self.p = np.zeros(reception)
+        self.p[0] = 1.0
+        self.tmp = np.empty(reception)
+        self.lo = 0
+        self.hi = 1
+        self.logscale = 0.0
+        self.samples = 0
+
+    def copy(self):
+        other = _Chain.__new__(_Chain)
+        other.__dict__.update(self.__dict__)
+        other.p = self.p.copy()
+        return other
+
+    def step(self):
+        (p, lo, hi) = (self.p, self.lo, self.hi)
+        tmp = self.tmp[:hi - lo]
+        np.multiply(p[lo:hi], self.move[lo:hi], out=tmp)
+        p[lo:hi] *= self.stay[lo:hi]
+        if hi < len(p):
+            p[lo + 1:hi + 1] += tmp
+            self.hi = hi + 1
+        else:
+            p[lo + 1:hi] += tmp[:-1]
+        self.samples += 1
+
+    def logFailure(self):
+        total = self.p[self.lo:self.hi].sum()
+        return self.logscale + math.log(total) if total > 0 else -math.inf
+
+    def normalize(self):
+        '''
+        Rescale to avoid underflows and drop negligible states
+        '''
+        window = self.p[self.lo:self.hi]
+        total = window.sum()
+        if total == 0:
+            return
+        window /= total
+        self.logscale += math.log(total)
+        keep = np.flatnonzero(window >= math.exp(self.cutoff - self.logscale))
+        window[:keep[0]] = 0.0
+        window[keep[-1] + 1:] = 0.0
+        self.hi = self.lo + keep[-1] + 1
+        self.lo += keep[0]
+
+
+def _unionBound(sec_par, codeword_len):
+    '''
+    Smallest s such that n * (1-1/n)^s <= 2^{-sec_par} for n = codeword_len.
+    For reception = codeword_len, this is the exact number of samples up
+    to a relative error of 2^{-sec_par} in the failure probability, as
+    the second term of the inclusion-exclusion formula is at most
+    (n choose 2) * (1-2/n)^s <= (n * (1-1/n)^s)^2 / 2.
+    '''
+    n = codeword_len
+    s = math.ceil((-sec_par - math.log2(n)) / math.log2(1.0 - 1.0 / n))
+    while s > 0 and math.log2(n) + (s - 1) * math.log2(1.0 - 1.0 / n) <= -sec_par:
+        s -= 1
+    while math.log2(n) + s * math.log2(1.0 - 1.0 / n) > -sec_par:
+        s += 1
+    return s
+
+
+@memoize
+def samples_exact(sec_par, reception, codeword_len):
+    '''
+    Compute the smallest number of samples such that at least reception
+    distinct out of codeword_len positions are sampled, except with
+    probability at most 2^{-sec_par}.
+    '''
+    assert 0 <= reception <= codeword_len
+    if reception <= 1:
+        return reception
+    if reception == codeword_len:
+        return _unionBound(sec_par, codeword_len)
+
+    target = -sec_par * math.log(2)
+    chain = _Chain(reception, codeword_len,
+                   target - DROP_BITS * math.log(2))
+    # advance by blocks of BLOCK steps, then find the first
+    # sufficient number of samples within the last block
+    while True:
+        saved = chain.copy()
+        for _ in range(BLOCK):
+            chain.step()
+        if chain.logFailure() <= target:
+            break
+        chain.normalize()
+    chain = saved
+    while True:
+        chain.step()
+        if chain.logFailure() <= target:
+            return chain.samples
+
+
+def log2_failure_probability(samples, reception, codeword_len):
+    '''
+    log2 of the probability that fewer than reception distinct out of
+    codeword_len positions are sampled with the given number of samples
+    (computed with the dynamic program, without dropping states)
+    '''
+    if samples < reception:
+        return 0.0
+    if reception == 0:
+        return -math.inf
+    chain = _Chain(reception, codeword_len, -math.inf)
+    while chain.samples < samples:
+        chain.step()
+        if chain.samples % BLOCK == 0:
+            chain.normalize()
+    return chain.logFailure() / math.log(2)
@@ -1,14 +1,26 @@
 #!/usr/bin/env python
 import math
+from functools import partial
 from schemes import *
+from memo import memoize
+from instrument import recordSearch
 
 GRINDING = 20
 RO_QUERIES = 60
 STATISTICAL_SECURITY = 40
 FRI_SOUNDNESS = STATISTICAL_SECURITY + RO_QUERIES - GRINDING
 
+# Ranges in which friGoodParameters searches for parameters
+FRI_FANIN_RANGE = [4, 8, 16]
+FRI_BASEDIMENSION_RANGE = [2, 4, 6, 8, 16, 32, 64, 128]
+FRI_MAX_BATCHSIZE = 256
 
+# Ranges of the inverse rate and the field size for the Pareto search (pareto.py)
+FRI_INVRATE_RANGE = [2, 4, 8, 16]
+FRI_FSIZE_RANGE = [128, 192, 256]
 
+
+@memoize
 def sizeMerkleOpening(numleafs, tuplesize, fsize):
     '''
     assume a Merkle tree that represents numleafs tuples of elements
@@ -25,6 +37,7 @@ def sizeMerkleOpening(numleafs, tuplesize, fsize):
     return tupleItself + sibling + copath
 
 
+@memoize
 def friAuthSize(domainsize, rate, fsize, batchsize, fanin, basedimension):
     '''
     size of the information needed to open one position
@@ -57,6 +70,7 @@ def friAuthSize(domainsize, rate, fsize, batchsize, fanin, basedimension):
     return size
 
 
+@memoize
 def friNumRounds(mink, fanin, basedimension):
     '''
     Function to compute the number of rounds, given the number of field
@@ -75,6 +89,7 @@ def friNumRounds(mink, fanin, basedimension):
     return rnd
 
 
+@memoize
 def friNumRepetitions(rate, domainsize, fsize, batchsize, fanin):
     '''
     Function to compute the number of repetitions of the query phase
@@ -100,7 +115,13 @@ def friNumRepetitions(rate, domainsize, fsize, batchsize, fanin):
     return math.ceil(L)
 
 
-def makeFRIScheme(datasize, invrate=4, fsize=128, verbose=False):
+def makeFRIScheme(datasize, invrate=4, fsize=128, verbose=False,
+                  maxbatchsize=FRI_MAX_BATCHSIZE, batchsize=None,
+                  fanin=None, basedimension=None):
+    '''
+    FRI-based scheme. The batch size, fan-in, and base dimension can be
+    given explicitly; the ones that are not given are chosen by friGoodParameters.
+    '''
     # determine k. Should be "compatible" with the fan-in
     # we need k to be at least ceil(datasize / fsize)
     minfe = math.ceil(datasize / fsize)
@@ -109,7 +130,11 @@ def makeFRIScheme(datasize, invrate=4, fsize=128, verbose=False):
               " field elements to represent the data.")
 
     # call algorithm to find good batchsize, fanin, and base dimension
-    (batchsize, fanin, basedimension) = friGoodParameters(minfe, fsize, invrate)
+    if None in (batchsize, fanin, basedimension):
+        good = friGoodParameters(minfe, fsize, invrate, maxbatchsize)
+        (batchsize, fanin, basedimension) = (
+            given if given is not None else g
+            for (given, g) in zip((batchsize, fanin, basedimension), good))
 
     mink = math.ceil(minfe / batchsize)
     if verbose:
@@ -152,28 +177,132 @@ def makeFRIScheme(datasize, invrate=4, fsize=128, verbose=False):
     return Scheme(
         com_size=roots + final + openings,
         code=rs.interleave(batchsize),
-        opening_overhead=opening_overhead
+        opening_overhead=opening_overhead,
+        costs=friCosts(k, n, rate, fsize, batchsize, fanin, basedimension),
+        multiproof_comm=partial(friMultiproofComm, n, rate, fsize, batchsize,
+                                fanin, basedimension)
     )
 
+
+def friMultiproofComm(domainsize, rate, fsize, batchsize, fanin, basedimension,
+                      samples):
+    '''
+    Expected total communication for samples uniformly random positions,
+    if the openings in every Merkle tree are sent as one multiproof,
+    with the same layout of Merkle trees as in friAuthSize
+    '''
+    size = samples * math.log2(domainsize)
+    if batchsize > 1:
+        # leaves of the batch Merkle tree that contain a queried position
+        opened = expectedOpened(2 ** math.ceil(math.log2(domainsize)), samples)
+        size += opened * batchsize * fsize
+        size += merkleMultiproofSize(domainsize, batchsize * fsize, samples)
+    ncurr = domainsize
+    while ncurr * rate > basedimension:
+        numleafs = ncurr // fanin
+        # leaves that contain a queried position
+        opened = expectedOpened(2 ** math.ceil(math.log2(numleafs)), samples)
+        size += opened * fanin * fsize
+        size += merkleMultiproofSize(numleafs, fanin * fsize, samples)
+        ncurr = numleafs
+    return size
+
+
+def friCosts(k, n, rate, fsize, batchsize, fanin, basedimension):
+    '''
+    Operation counts of the prover, verifier, and decoder of the FRI
+    scheme, with the same layout of Merkle trees as in friAuthSize
+    '''
+    # encode batchsize rows, commit to them, and combine them
+    prover = batchsize * nttCounts(n, fsize)
+    if batchsize > 1:
+        prover += merkleTreeCounts(n, batchsize * fsize)
+        prover += OpCounts(fmul=batchsize * n * fieldMults(fsize))
+    # fold and commit to every oracle except the final one
+    ncurr = n
+    while ncurr * rate > basedimension:
+        numleafs = ncurr // fanin
+        prover += merkleTreeCounts(numleafs, fanin * fsize)
+        prover += OpCounts(fmul=ncurr * fieldMults(fsize))
+        ncurr = numleafs
+
+    # a sample is a leaf of the first Merkle tree
+    if batchsize > 1:
+        verifier = merklePathCounts(n, batchsize * fsize)
+    else:
+        verifier = merklePathCounts(n // fanin, fanin * fsize)
+
+    return SchemeCosts(
+        prover=prover,
+        verifier=verifier,
+        decoder=batchsize * decodeCounts(k, fsize),
+    )
+
+
+def friSchemeParameters(datasize, invrate=4, fsize=128,
+                        maxbatchsize=FRI_MAX_BATCHSIZE, batchsize=None,
+                        fanin=None, basedimension=None):
+    '''
+    Returns the parameters (batchsize, fanin, basedimension, rounds)
+    that makeFRIScheme picks for the given datasize and arguments
+    '''
+    minfe = math.ceil(datasize / fsize)
+    if None in (batchsize, fanin, basedimension):
+        good = friGoodParameters(minfe, fsize, invrate, maxbatchsize)
+        (batchsize, fanin, basedimension) = (
+            given if given is not None else g
+            for (given, g) in zip((batchsize, fanin, basedimension), good))
+    r = friNumRounds(math.ceil(minfe / batchsize), fanin, basedimension)
+    return (batchsize, fanin, basedimension, r)
+
 # --------------------------------------------------------------------------#
 #                           OPTIMIZATION SECTION                           #
 # --------------------------------------------------------------------------#
 
 
-def friGoodBatchsize(minfe, fsize, invrate, basedimension, fanin):
+def friBatchsizeCandidates(minfe, fanin, basedimension, maxbatchsize):
+    '''
+    Returns the batch sizes in range(1, maxbatchsize + 1) that can minimize
+    the size of an opening, in increasing order. The number of rounds
+    for batch size b is friNumRounds(ceil(minfe / b), fanin, basedimension),
+    and it is at most r if and only if b >= ceil(minfe / (basedimension * fanin^r)).
+    So the number of rounds is constant on intervals between these breakpoints,
+    and within such an interval, the size of an opening is increasing in b for
+    b > 1 (the batch Merkle tree gets larger leafs). Hence, it is enough to
+    consider batch size 1, batch size 2, and all breakpoints.
+    '''
+    candidates = {1}
+    if maxbatchsize >= 2:
+        candidates.add(2)
+    dimension = basedimension
+    while True:
+        b = math.ceil(minfe / dimension)
+        if 2 < b <= maxbatchsize:
+            candidates.add(b)
+        if b <= 2:
+            break
+        dimension *= fanin
+    return sorted(candidates)
+
+
+def friGoodBatchsize(minfe, fsize, invrate, basedimension, fanin,
+                     maxbatchsize=FRI_MAX_BATCHSIZE):
     '''
     given the minimum number of field elements we need to represent (minfe),
     the field size (fsize), the inverse rate (invrate), the basedimension, and
     the fanin, this function computes a good batchsize. Good means that the
-    batchsize minimizes (in a certain range) the size of a single opening
+    batchsize minimizes (in the range 1 to maxbatchsize) the size of a single
+    opening. Ties are broken in favor of the larger batchsize.
     '''
-    batchsizerange = range(1, 257)
     batchsize = 1
     mink = math.ceil(minfe / batchsize)
     r = friNumRounds(mink, fanin, basedimension)
     minauthsize = friAuthSize(basedimension * (fanin**r) * invrate,
                               1.0 / invrate, fsize, batchsize, fanin, basedimension)
-    for b in batchsizerange:
+    candidates = friBatchsizeCandidates(minfe, fanin, basedimension, maxbatchsize)
+    recordSearch("friGoodBatchsize", evaluated=len(candidates),
+                 pruned=maxbatchsize - len(candidates))
+    for b in candidates:
         mink = math.ceil(minfe / b)
         r = friNumRounds(mink, fanin, basedimension)
         currauthsize = friAuthSize(
@@ -184,21 +313,23 @@ def friGoodBatchsize(minfe, fsize, invrate, basedimension, fanin):
     return batchsize
 
 
-def friGoodParameters(minfe, fsize, invrate):
+@memoize
+def friGoodParameters(minfe, fsize, invrate, maxbatchsize=FRI_MAX_BATCHSIZE):
     '''
     given the minimum number of field elements we need to represent (minfe),
     the field size (fsize) and the inverse rate (invrate), this function
     computes (batchsize, fanin, basedimension) for FRI that works reasonably
     well. This is for sure not always the optimal setting, especially if a
-    specific metric should be optimized, e.g., communication per query
+    specific metric should be optimized, e.g., communication per query.
+    Batch sizes are searched in the range 1 to maxbatchsize.
     '''
 
     # overall idea is to minimize the gap between the dimension on the largest layer
     # and the dimension we would actually need to represent minfe elements. That is,
     # we minimimize gap = basedimension * fanin^rounds - minfe / batchsize, ensuring
     # that gap >= 0. To do so, we try a few reasonable fanins and base dimensions
-    faninrange = [4, 8, 16]
-    basedimensionrange = [2, 4, 6, 8, 16, 32, 64, 128]
+    faninrange = FRI_FANIN_RANGE
+    basedimensionrange = FRI_BASEDIMENSION_RANGE
 
     # start minimazation loop. Iterate over all combinations (fanin, basedimension)
     optfanin = 0
@@ -211,7 +342,7 @@ def friGoodParameters(minfe, fsize, invrate):
             # we need to know a suitable batchsize first. To find it, we want
             # to minimize the size of an opening, i.e., minimize friAuthSize
             batchsize = friGoodBatchsize(
-                minfe, fsize, invrate, basedimension, fanin)
+                minfe, fsize, invrate, basedimension, fanin, maxbatchsize)
             mink = math.ceil(minfe / batchsize)
 
             # determine the number of rounds that we need now
@@ -225,4 +356,5 @@ def friGoodParameters(minfe, fsize, invrate):
                 optbasedimension = basedimension
                 optbatchsize = batchsize
 
+    recordSearch("friGoodParameters", evaluated=len(faninrange) * len(basedimensionrange))
     return (optbatchsize, optfanin, optbasedimension)
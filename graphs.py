@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import argparse
 import math
 import sys
 import csv
@@ -7,12 +8,23 @@ import os
 
 from schemes import *
 from fri import *
+from sweep import *
+from store import *
+from adaptive import *
 
-# the graphs will be for data sizes 
+# the graphs will be for data sizes
 # i*DATASIZEUNIT for every i in DATASIZERANGE
 DATASIZEUNIT = 8000*1000  # Megabytes
 DATASIZERANGE = range(1, 156, 15)
 
+# schemes (names in the registry SCHEMES) for which we write graphs
+GRAPHS = ["rs", "tensor", "hash", "homhash", "fri"]
+
+
+# suffixes of the csv files of a scheme, in the order of graphValues
+GRAPH_FILES = ["com", "comm_pq", "comm_total", "comm_total_multiproof",
+               "encoding", "prover", "verifier", "decoder"]
+
 
 def writeCSV(path, d):
     with open(path, mode="w") as outfile:
@@ -21,38 +33,183 @@ def writeCSV(path, d):
             writer.writerow([x, d[x]])
 
 
-def writeScheme(name, makeScheme):
+def graphValues(metrics):
     '''
-    Writes the graphs for a given scheme into a csv file
-    The scheme should be specified by a function makeScheme
-    that takes as input the datasize.
+    Values of the graphs in GRAPH_FILES for a tuple of METRICS
+    '''
+    (com_size, comm_per_query, total_comm, encoding_size) = metrics[:4]
+    (prover_time, verifier_time, decoder_time,
+     total_comm_multiproof) = metrics[7:11]
+    return (com_size / 8000000,  # MB
+            comm_per_query / 8000,  # KB
+            total_comm / 8000000000,  # GB
+            total_comm_multiproof / 8000000000,  # GB
+            encoding_size / 8000000000,  # GB
+            prover_time,  # s
+            verifier_time * 1000,  # ms
+            decoder_time)  # s
+
+
+def graphX(datasize):
     '''
+    x-value of a datasize in bits in the csv files: the datasize in units
+    of DATASIZEUNIT, as an int if it is a multiple of DATASIZEUNIT
+    '''
+    if datasize % DATASIZEUNIT == 0:
+        return datasize // DATASIZEUNIT
+    return datasize / DATASIZEUNIT
 
-    commitment = {}
-    commpq = {}
-    commtotal = {}
-    encoding = {}
 
-    for s in DATASIZERANGE:
-        datasize = s*DATASIZEUNIT
-        scheme = makeScheme(datasize)
-        commitment[s] = scheme.com_size / 8000000  # MB
-        commpq[s] = scheme.comm_per_query() / 8000  # KB
-        commtotal[s] = scheme.total_comm() / 8000000000  # GB
-        encoding[s] = scheme.encoding_size() / 8000000000  # GB
+def writeScheme(name, rows):
+    '''
+    Writes the graphs for a given scheme into a csv file
+    The scheme should be specified by rows, which maps
+    every i in DATASIZERANGE (or any other datasize in
+    units of DATASIZEUNIT) to the tuple of METRICS
+    of the scheme for datasize i*DATASIZEUNIT.
+    '''
+    values = {s: graphValues(rows[s]) for s in rows}
 
     if not os.path.exists("./csvdata/"):
         os.makedirs("./csvdata")
 
-    writeCSV("./csvdata/"+name+"_com.csv", commitment)
-    writeCSV("./csvdata/"+name+"_comm_pq.csv", commpq)
-    writeCSV("./csvdata/"+name+"_comm_total.csv", commtotal)
-    writeCSV("./csvdata/"+name+"_encoding.csv", encoding)
+    for j, suffix in enumerate(GRAPH_FILES):
+        writeCSV("./csvdata/"+name+"_"+suffix+".csv", {s: values[s][j] for s in values})
+
+
+class CSVSink:
+    '''
+    Sink for runPipeline writing the same csv files as writeScheme
+    for the given schemes, row by row as the points arrive
+    '''
+
+    def __init__(self, schemes):
+        if not os.path.exists("./csvdata/"):
+            os.makedirs("./csvdata")
+        self.files = []
+        self.writers = {}
+        for name in schemes:
+            self.writers[name] = []
+            for suffix in GRAPH_FILES:
+                outfile = open("./csvdata/"+name+"_"+suffix+".csv", mode="w")
+                self.files.append(outfile)
+                self.writers[name].append(csv.writer(outfile, delimiter=','))
+
+    def write(self, pairs):
+        for point, metrics in pairs:
+            x = graphX(point.datasize)
+            for writer, value in zip(self.writers[point.scheme], graphValues(metrics)):
+                writer.writerow([x, value])
+
+    def close(self):
+        for outfile in self.files:
+            outfile.close()
+
+
+def writeErrors(path, result):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode="w") as outfile:
+        for e in result.errors:
+            outfile.write("{} datasize={} params={}\n{}\n".format(
+                e.point.scheme, e.point.datasize, e.point.kwargs(), e.traceback))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write csv files with the metrics of all schemes in GRAPHS.")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of parallel workers (default: 1, 0 for all cores)")
+    parser.add_argument("--backend", choices=BACKENDS, default="process",
+                        help="use a process pool or a thread pool (for free-threaded Python)")
+    parser.add_argument("--store", nargs="?", const=DEFAULT_STORE_PATH, default=None,
+                        help="reuse and save results in an sqlite file (default: "
+                        + DEFAULT_STORE_PATH + ")")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="refine the grid adaptively between the first and last "
+                        "datasize of DATASIZERANGE instead of using DATASIZERANGE")
+    parser.add_argument("--budget", type=int, default=200,
+                        help="maximum number of points per scheme with --adaptive")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="relative change of a metric that triggers a refinement")
+    parser.add_argument("--resolution", type=int, default=1,
+                        help="smallest distance between points in bits with --adaptive")
+    parser.add_argument("--npy", nargs="?", const="./npydata", default=None,
+                        help="write one .npy file per metric (see columnar.py) into this "
+                        "directory (default: ./npydata) instead of the csv files")
+    parser.add_argument("--from-npy", metavar="DIR", default=None,
+                        help="write the csv files from the data written with --npy "
+                        "instead of evaluating the schemes")
+    parser.add_argument("--sizes", default=None,
+                        help="data sizes as a comma-separated list of sizes and ranges "
+                        "start:stop[:step] in MB or with units, e.g., 1:10000:0.5 "
+                        "(default: DATASIZERANGE)")
+    parser.add_argument("--chunksize", type=int, default=STREAM_CHUNKSIZE,
+                        help="number of points per chunk sent to a worker")
+    parser.add_argument("--maxpending", type=int, default=None,
+                        help="maximum number of chunks in flight (default: 2 * workers)")
+    parser.add_argument("--batchsize", type=int, default=STREAM_BATCHSIZE,
+                        help="number of points per batch written to the output")
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else defaultWorkers()
+
+    if args.from_npy is not None:
+        from columnar import loadColumns
+        for group in loadColumns(args.from_npy):
+            writeScheme(group.scheme, {graphX(d): m for d, m in group.rows()})
+        return
+
+    store = ResultStore(args.store) if args.store is not None else None
+
+    if args.adaptive:
+        lo = DATASIZERANGE[0] * DATASIZEUNIT
+        hi = DATASIZERANGE[-1] * DATASIZEUNIT
+        results = [refineGrid(name, lo, hi, tolerance=args.tolerance,
+                              budget=args.budget, resolution=args.resolution,
+                              workers=workers, backend=args.backend, store=store)
+                   for name in GRAPHS]
+        result = SweepResult(
+            points=[p for r in results for p in r.points],
+            metrics=[m for r in results for m in r.metrics],
+            errors=[e for r in results for e in r.errors])
+        if args.npy is not None:
+            from columnar import writeColumns
+            writeColumns(args.npy, result)
+        else:
+            rows = {name: {} for name in GRAPHS}
+            for point, metrics in result:
+                rows[point.scheme][graphX(point.datasize)] = metrics
+            for name in GRAPHS:
+                writeScheme(name, rows[name])
+    else:
+        # the points are generated lazily and streamed to the output
+        def datasizes():
+            if args.sizes is not None:
+                return parseSizes(args.sizes)
+            return (s * DATASIZEUNIT for s in DATASIZERANGE)
+        points = (makePoint(name, d) for name in GRAPHS for d in datasizes())
+        if args.npy is not None:
+            from columnar import ColumnWriter
+            sink = ColumnWriter(args.npy)
+        else:
+            sink = CSVSink(GRAPHS)
+        errors = runPipeline(points, [sink], batchsize=args.batchsize,
+                             workers=workers, backend=args.backend,
+                             chunksize=args.chunksize, maxpending=args.maxpending,
+                             store=store)
+        # only the failed points are kept in memory
+        result = SweepResult(points=[], metrics=[], errors=errors)
+    if store is not None:
+        store.close()
+
+    if result.errors:
+        # next to the output, i.e., in the --npy directory or in ./csvdata
+        path = os.path.join(args.npy if args.npy is not None else "./csvdata", "errors.txt")
+        print(str(len(result.errors)) + " points failed, see " + path + ":",
+              file=sys.stderr)
+        printErrors(result, file=sys.stderr)
+        writeErrors(path, result)
+        sys.exit(1)
 
 
-############################################
-writeScheme("rs", makeKZGScheme)
-writeScheme("tensor", makeTensorScheme)
-writeScheme("hash", makeHashBasedScheme)
-writeScheme("homhash", makeHomHashBasedScheme)
-writeScheme("fri", makeFRIScheme)
+if __name__ == "__main__":
+    main()
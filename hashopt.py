@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+'''
+Parameters of the hash-based schemes derived from a target soundness.
+
+makeHashBasedScheme and makeHomHashBasedScheme take the repetition
+parameters P and L as arguments. Here, we choose the smallest P and L
+such that both checks have soundness error at most 2^{-secpar}:
+- each of the P random linear combinations of the rows fails to detect
+  a row that is far from the code with probability at most n / |F|,
+  so we need P * (fsize - log2(n)) >= secpar,
+- each of the L spot checks of a combination against the columns fails
+  with probability at most (k - 1) / n (the fraction of positions at
+  which two distinct codewords can agree), so we need
+  L * -log2((k - 1) / n) >= secpar.
+Then, we search over the inverse rate and the shape of the data matrix
+(the number of rows) and return the scheme minimizing a given metric.
+
+Usage: python3 hashopt.py <data size in MB> [metric]
+'''
+
+import math
+import sys
+
+from schemes import *
+from instrument import recordSearch
+
+# target soundness, the same as for FRI (see fri.py)
+HASH_SOUNDNESS = 80
+
+# inverse rates in which the search is done
+HASH_INVRATE_RANGE = [2, 4, 8, 16]
+
+# the number of rows is searched in steps of a factor 2^(1/HASH_SHAPE_STEPS)
+HASH_SHAPE_STEPS = 4
+
+
+def hashRepetitions(secpar, fsize, k, n):
+    '''
+    Smallest (P, L) such that both checks of the hash-based scheme with
+    message length k, codeword length n, and field size fsize have
+    soundness error at most 2^{-secpar}. Returns None if no P suffices.
+    '''
+    if fsize <= math.log2(n):
+        return None
+    P = math.ceil(secpar / (fsize - math.log2(n)))
+    L = math.ceil(secpar / -math.log2((k - 1) / n)) if k > 1 else 1
+    return (P, L)
+
+
+def shapeCandidates(m):
+    '''
+    Numbers of rows to try for a data matrix with m elements: the square
+    shape (None) and all ceil(2^(i/HASH_SHAPE_STEPS)) between 1 and m
+    '''
+    candidates = [None]
+    for i in range(HASH_SHAPE_STEPS * math.ceil(math.log2(max(2, m))) + 1):
+        rows = math.ceil(2 ** (i / HASH_SHAPE_STEPS))
+        if rows <= m and rows not in candidates:
+            candidates.append(rows)
+    return candidates
+
+
+def _metric(scheme, metric):
+    value = getattr(scheme, metric)
+    return value() if callable(value) else value
+
+
+def _optimize(makeScheme, datasize, fsize, metric, secpar, invrates):
+    '''
+    Parameters (as a dict of keyword arguments of makeScheme) minimizing
+    metric over all inverse rates and shapes, with the smallest P and L
+    for the target soundness. Ties are broken by the order of the candidates.
+    '''
+    m = math.ceil(datasize / fsize)
+    best = None
+    evaluated = pruned = 0
+    for invrate in invrates:
+        for rows in shapeCandidates(m):
+            k = math.ceil(math.sqrt(m)) if rows is None else math.ceil(m / rows)
+            n = invrate * k
+            repetitions = hashRepetitions(secpar, fsize, k, n)
+            if repetitions is None or 2 ** fsize < n:
+                pruned += 1
+                continue
+            evaluated += 1
+            params = dict(P=repetitions[0], L=repetitions[1], invrate=invrate, rows=rows)
+            value = _metric(makeScheme(datasize, **params), metric)
+            if best is None or value < best[0]:
+                best = (value, params)
+    recordSearch("hashopt", evaluated=evaluated, pruned=pruned)
+    assert best is not None, "no parameters satisfy the target soundness"
+    return best[1]
+
+
+def hashBasedParameters(datasize, fsize=32, metric="total_comm",
+                        secpar=HASH_SOUNDNESS, invrates=HASH_INVRATE_RANGE):
+    '''
+    Parameters P, L, invrate, and rows of the hash-based scheme with the
+    smallest P and L for the target soundness, and the inverse rate and
+    number of rows that minimize metric (the name of a field or method
+    of Scheme, e.g., "com_size" or "total_comm").
+    '''
+    def make(datasize, **params):
+        return makeHashBasedScheme(datasize, fsize=fsize, **params)
+    return _optimize(make, datasize, fsize, metric, secpar, invrates)
+
+
+def homHashBasedParameters(datasize, metric="total_comm",
+                           secpar=HASH_SOUNDNESS, invrates=HASH_INVRATE_RANGE):
+    '''
+    Parameters P, L, invrate, and rows of the homomorphic hash-based scheme,
+    as in hashBasedParameters
+    '''
+    return _optimize(makeHomHashBasedScheme, datasize, PEDERSEN_FE_SIZE,
+                     metric, secpar, invrates)
+
+
+def optimizeHashBasedScheme(datasize, fsize=32, metric="total_comm",
+                            secpar=HASH_SOUNDNESS, invrates=HASH_INVRATE_RANGE):
+    '''
+    Hash-based scheme with the parameters from hashBasedParameters
+    '''
+    params = hashBasedParameters(datasize, fsize, metric, secpar, invrates)
+    return makeHashBasedScheme(datasize, fsize=fsize, **params)
+
+
+def optimizeHomHashBasedScheme(datasize, metric="total_comm",
+                               secpar=HASH_SOUNDNESS, invrates=HASH_INVRATE_RANGE):
+    '''
+    Homomorphic hash-based scheme with the parameters from homHashBasedParameters
+    '''
+    params = homHashBasedParameters(datasize, metric, secpar, invrates)
+    return makeHomHashBasedScheme(datasize, **params)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 hashopt.py <data size in MB> [metric]")
+        sys.exit(-1)
+    datasize = int(float(sys.argv[1]) * 8000000)
+    metric = sys.argv[2] if len(sys.argv) > 2 else "total_comm"
+    for (name, parameters, makeScheme) in [
+            ("hash", hashBasedParameters, makeHashBasedScheme),
+            ("homhash", homHashBasedParameters, makeHomHashBasedScheme)]:
+        params = parameters(datasize, metric=metric)
+        scheme = makeScheme(datasize, **params)
+        print("{}: P = {}, L = {}, invrate = {}, rows = {}, k = {}, n = {}, "
+              "|com| = {:.2f} KB, Comm Total = {:.2f} MB, {} = {}".format(
+                  name, params["P"], params["L"], params["invrate"],
+                  "square" if params["rows"] is None else params["rows"],
+                  scheme.code.msg_len, scheme.code.codeword_len,
+                  scheme.com_size / 8000, scheme.total_comm() / 8000000,
+                  metric, _metric(scheme, metric)))
+
+
+if __name__ == "__main__":
+    main()
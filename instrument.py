@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+'''
+Opt-in instrumentation of the cost model: call counts, cumulative and
+self time of every function, and statistics of the parameter searches.
+
+Instrumentation replaces the functions and methods defined in the
+modules INSTRUMENTED_MODULES by timing wrappers, in these modules and in
+every other module of this repository that refers to them (e.g., via
+"from fri import *", or in the registry SCHEMES). When it is not
+enabled, nothing is replaced, so there is no overhead except for the
+calls to recordSearch, which return immediately.
+
+Use it as a context manager:
+
+    with instrumented() as profile:
+        makeFRIScheme(32 * 8000000)
+    print(profile.summary())
+
+or set the environment variable DAS_INSTRUMENT to enable it for a whole
+run of table.py or graphs.py: the summary is printed to stderr at exit,
+and if the value ends with .json, the profile is also written to that
+file. With worker processes (-j), only the calls in the main process
+are recorded.
+'''
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+
+import atexit
+import functools
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+# modules whose functions and methods are instrumented
+INSTRUMENTED_MODULES = ["codes", "costs", "schemes", "fri", "hashopt"]
+
+# directory of this repository: references in its modules are replaced
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the Profile that is recorded to, or None if instrumentation is disabled
+_ACTIVE = None
+
+
+@dataclass
+class FunctionStats:
+    calls: int = 0
+    total_time: float = 0.0  # including the time spent in instrumented callees
+    self_time: float = 0.0   # excluding the time spent in instrumented callees
+
+
+@dataclass
+class SearchStats:
+    searches: int = 0   # number of searches
+    evaluated: int = 0  # candidates evaluated
+    pruned: int = 0     # candidates skipped without evaluating them
+
+
+@dataclass
+class Profile:
+    functions: dict = field(default_factory=dict)  # name -> FunctionStats
+    searches: dict = field(default_factory=dict)   # name -> SearchStats
+
+    def __post_init__(self):
+        self._local = threading.local()
+
+    def _stack(self):
+        '''
+        Per thread stack of the time spent in callees of the running calls
+        '''
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def summary(self, limit=None):
+        '''
+        Table of the functions sorted by self time, and of the searches
+        '''
+        lines = ["{:<45} {:>10} {:>12} {:>12}".format(
+            "function", "calls", "total [s]", "self [s]")]
+        functions = sorted(self.functions.items(), key=lambda f: -f[1].self_time)
+        for name, s in functions[:limit]:
+            if s.calls > 0:
+                lines.append("{:<45} {:>10} {:>12.4f} {:>12.4f}".format(
+                    name, s.calls, s.total_time, s.self_time))
+        if self.searches:
+            lines.append("")
+            lines.append("{:<45} {:>10} {:>12} {:>12}".format(
+                "search", "searches", "evaluated", "pruned"))
+            for name, s in sorted(self.searches.items()):
+                lines.append("{:<45} {:>10} {:>12} {:>12}".format(
+                    name, s.searches, s.evaluated, s.pruned))
+        return "\n".join(lines)
+
+    def toDict(self):
+        return {
+            "functions": {name: asdict(s) for name, s in self.functions.items() if s.calls > 0},
+            "searches": {name: asdict(s) for name, s in self.searches.items()},
+        }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.toDict(), f, indent=2)
+
+
+def recordSearch(name, evaluated=0, pruned=0):
+    '''
+    Record one search that evaluated and pruned the given numbers of
+    candidates. Does nothing if instrumentation is disabled.
+    '''
+    if _ACTIVE is None:
+        return
+    stats = _ACTIVE.searches.setdefault(name, SearchStats())
+    stats.searches += 1
+    stats.evaluated += evaluated
+    stats.pruned += pruned
+
+
+def _wrap(profile, name, fn):
+    stats = profile.functions.setdefault(name, FunctionStats())
+    perf_counter = time.perf_counter
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stack = profile._stack()
+        stack.append(0.0)
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            callees = stack.pop()
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.self_time += elapsed - callees
+            if stack:
+                stack[-1] += elapsed
+    return wrapper
+
+
+def _targets(modules):
+    '''
+    (qualified name, owner, attribute, function) for all functions and
+    methods defined in the given modules
+    '''
+    for module in modules:
+        for name, obj in list(vars(module).items()):
+            if getattr(obj, "__module__", None) != module.__name__:
+                continue
+            if inspect.isclass(obj):
+                for attr, method in list(vars(obj).items()):
+                    if inspect.isfunction(method) and not attr.startswith("__"):
+                        yield (module.__name__ + "." + obj.__name__ + "." + attr,
+                               obj, attr, method)
+            elif callable(obj) and not name.startswith("__"):
+                yield (module.__name__ + "." + name, module, name, obj)
+
+
+def _repoModules():
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path is not None and os.path.dirname(os.path.abspath(path)) == REPO_DIR \
+                and module.__name__ != __name__:
+            yield module
+
+
+def enable(modules=None):
+    '''
+    Replace the functions and methods of the given modules (default:
+    INSTRUMENTED_MODULES) by wrappers recording into a new Profile.
+    Returns the profile and a function that undoes the replacements.
+    '''
+    global _ACTIVE
+    assert _ACTIVE is None, "instrumentation is already enabled"
+    modules = [importlib.import_module(m) for m in (modules or INSTRUMENTED_MODULES)]
+    profile = Profile()
+    restore = []  # (container, key, original)
+
+    # id of the original -> (original, wrapper); methods are replaced in their class
+    wrappers = {}
+    for (name, owner, attr, fn) in _targets(modules):
+        if id(fn) not in wrappers:
+            wrappers[id(fn)] = (fn, _wrap(profile, name, fn))
+        if inspect.isclass(owner):
+            restore.append((owner, attr, fn))
+            setattr(owner, attr, wrappers[id(fn)][1])
+
+    def replace(container, key, value):
+        if id(value) in wrappers and wrappers[id(value)][0] is value:
+            restore.append((container, key, value))
+            container[key] = wrappers[id(value)][1]
+
+    # functions are replaced wherever a module of this repository refers to
+    # them, including the values of registries such as SCHEMES
+    for module in _repoModules():
+        namespace = vars(module)
+        for key, value in list(namespace.items()):
+            if isinstance(value, dict) and key.isupper():
+                for k, v in list(value.items()):
+                    replace(value, k, v)
+            else:
+                replace(namespace, key, value)
+    _ACTIVE = profile
+
+    def disable():
+        global _ACTIVE
+        for (container, key, original) in reversed(restore):
+            if isinstance(container, dict):
+                container[key] = original
+            else:
+                setattr(container, key, original)
+        _ACTIVE = None
+    return (profile, disable)
+
+
+@contextmanager
+def instrumented(modules=None):
+    '''
+    Context manager recording into a Profile while it is active
+    '''
+    (profile, disable) = enable(modules)
+    try:
+        yield profile
+    finally:
+        disable()
+
+
+def enableFromEnvironment():
+    '''
+    Enable instrumentation for the whole process if the environment
+    variable DAS_INSTRUMENT is set, and report the profile at exit
+    '''
+    path = os.environ.get("DAS_INSTRUMENT")
+    if not path or _ACTIVE is not None or multiprocessing.parent_process() is not None:
+        return
+    (profile, _) = enable()
+
+    def report():
+        print(profile.summary(), file=sys.stderr)
+        if path.endswith(".json"):
+            profile.write(path)
+    atexit.register(report)
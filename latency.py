@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+'''
+Latency model of sampling: the time until a light client has completed
+all of its samples() queries ("time to availability").
+
+A client keeps up to inflight requests open at the same time, each to a
+different peer, and starts the next query whenever a request completes.
+A request for an opening of size = comm_per_query() bits takes
+    rtt + size / bandwidth + an exponentially distributed delay of mean jitter,
+independently of the other requests.
+
+completionQuantile computes quantiles of the completion time
+analytically: with w = min(inflight, samples) parallel requests, the
+last query starts after r = (samples - 1) // w rounds, i.e., after about
+r * w durations spread over w slots (normally distributed by the central
+limit theorem), and it ends at the latest of the w requests then in
+progress. This is exact without jitter and for samples <= inflight,
+and otherwise slightly above the simulated quantiles (a few percent for
+samples just above inflight, less for many samples).
+
+simulateCompletion samples the completion time exactly (a discrete-event
+simulation of the client, vectorized over trials): every slot runs an
+i.i.d. sequence of requests, the last query starts at the samples-th
+smallest start time over all slots, and the client is done when every
+slot has finished the request it runs at that time.
+
+Usage: python3 latency.py <data size in MB> [options]
+'''
+
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import argparse
+import math
+
+from sweep import *
+
+# quantile of the completion time reported as time to availability
+LATENCY_QUANTILE = 0.99
+
+
+@dataclass
+class LatencyProfile:
+    rtt: float = 0.1          # round trip time in seconds
+    bandwidth: float = 1e8    # bandwidth of a peer to the client in bits per second
+    inflight: int = 16        # maximum number of requests in flight
+    jitter: float = 0.02      # mean of the random delay of a request in seconds
+
+    def requestTime(self, size):
+        '''
+        Time of a request for size bits without the random delay
+        '''
+        return self.rtt + size / self.bandwidth
+
+
+DEFAULT_LATENCY_PROFILE = LatencyProfile()
+
+
+def completionQuantile(samples, size, p=LATENCY_QUANTILE, profile=DEFAULT_LATENCY_PROFILE):
+    '''
+    Approximate p-quantile of the time to complete samples
+    requests of size bits each (see above)
+    '''
+    if samples <= 0:
+        return 0.0
+    fixed = profile.requestTime(size)
+    w = min(profile.inflight, samples)
+    rounds = (samples - 1) // w
+    # the last query starts after rounds durations of each slot on average
+    start = rounds * (fixed + profile.jitter)
+    if rounds > 0 and profile.jitter > 0:
+        start += NormalDist().inv_cdf(p) * profile.jitter * math.sqrt(rounds / w)
+    # the latest of the w requests then in progress
+    last = fixed - profile.jitter * math.log1p(-p ** (1.0 / w))
+    return start + last
+
+
+def completionMean(samples, size, profile=DEFAULT_LATENCY_PROFILE):
+    '''
+    Approximate mean time to complete samples requests of size bits each
+    '''
+    if samples <= 0:
+        return 0.0
+    w = min(profile.inflight, samples)
+    rounds = (samples - 1) // w
+    harmonic = sum(1.0 / i for i in range(1, w + 1))
+    return rounds * (profile.requestTime(size) + profile.jitter) + \
+        profile.requestTime(size) + profile.jitter * harmonic
+
+
+def simulateCompletion(samples, size, trials=1000, profile=DEFAULT_LATENCY_PROFILE,
+                       seed=0, maxentries=2**24):
+    '''
+    Completion times of trials simulated clients (a NumPy array)
+    '''
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    fixed = profile.requestTime(size)
+    w = min(profile.inflight, samples)
+    # requests per slot: enough that the slots do not run out before the
+    # last query starts (checked below, with more requests otherwise)
+    perslot = samples // w + 8 + int(4 * math.sqrt(samples / w))
+    batch = max(1, maxentries // (w * perslot))
+    results = []
+    done = 0
+    while done < trials:
+        n = min(batch, trials - done)
+        durations = fixed + rng.exponential(profile.jitter, (n, w, perslot)) \
+            if profile.jitter > 0 else np.full((n, w, perslot), fixed)
+        ends = np.cumsum(durations, axis=2)
+        # shifted rather than ends - durations, which may differ in the last bit
+        starts = np.concatenate([np.zeros((n, w, 1)), ends[:, :, :-1]], axis=2)
+        # start time of the last query
+        laststart = np.partition(starts.reshape(n, -1), samples - 1, axis=1)[:, samples - 1]
+        if np.any(starts[:, :, -1] <= laststart[:, None]):
+            perslot *= 2
+            batch = max(1, maxentries // (w * perslot))
+            continue
+        # end of the request every slot runs when the last query starts
+        running = np.where(ends > laststart[:, None, None], ends, np.inf).min(axis=2)
+        results.append(running.max(axis=1))
+        done += n
+    return np.concatenate(results)
+
+
+def timeToAvailability(metrics, p=LATENCY_QUANTILE, profile=DEFAULT_LATENCY_PROFILE):
+    '''
+    p-quantile of the completion time for a tuple of METRICS
+    '''
+    return completionQuantile(metrics[METRICS.index("samples")],
+                              metrics[METRICS.index("comm_per_query")], p, profile)
+
+
+def main():
+    import numpy as np
+    parser = argparse.ArgumentParser(
+        description="Print the time until a client has completed its samples for every scheme.")
+    parser.add_argument("datasize", type=float, help="data size in MB")
+    parser.add_argument("--rtt", type=float, default=DEFAULT_LATENCY_PROFILE.rtt * 1000,
+                        help="round trip time in ms")
+    parser.add_argument("--bandwidth", type=float,
+                        default=DEFAULT_LATENCY_PROFILE.bandwidth / 1e6,
+                        help="bandwidth per peer in Mbit/s")
+    parser.add_argument("--inflight", type=int, default=DEFAULT_LATENCY_PROFILE.inflight,
+                        help="maximum number of requests in flight")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_LATENCY_PROFILE.jitter * 1000,
+                        help="mean random delay per request in ms")
+    parser.add_argument("--trials", type=int, default=100,
+                        help="number of simulated clients per scheme")
+    args = parser.parse_args()
+    profile = LatencyProfile(rtt=args.rtt / 1000, bandwidth=args.bandwidth * 1e6,
+                             inflight=args.inflight, jitter=args.jitter / 1000)
+
+    datasize = int(args.datasize * 8000000)
+    print("{:<12} {:>10} {:>12}   {:>10} {:>10} {:>10}   {:>10} {:>10} {:>10}".format(
+        "scheme", "samples", "query [KB]", "mean [s]", "p50 [s]", "p99 [s]",
+        "sim. mean", "sim. p50", "sim. p99"))
+    for name, makeScheme in SCHEMES.items():
+        scheme = makeScheme(datasize)
+        (samples, size) = (scheme.samples(), scheme.comm_per_query())
+        times = simulateCompletion(samples, size, args.trials, profile)
+        print("{:<12} {:>10} {:>12.2f}   {:>10.3f} {:>10.3f} {:>10.3f}   "
+              "{:>10.3f} {:>10.3f} {:>10.3f}".format(
+                  name, samples, size / 8000,
+                  completionMean(samples, size, profile),
+                  completionQuantile(samples, size, 0.5, profile),
+                  completionQuantile(samples, size, 0.99, profile),
+                  np.mean(times), np.percentile(times, 50), np.percentile(times, 99)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+'''
+Bounded memoization for the pure functions of the cost model.
+
+Functions decorated with @memoize keep an LRU cache of their results,
+keyed by their arguments. All caches are registered by function name,
+so that they can be inspected, cleared and resized together:
+
+    from fri import *
+    from memo import *
+    makeFRIScheme(32 * 8000000)
+    printCacheStats()
+    resizeCaches(1024)
+    clearCaches()
+
+The default capacity of every cache is MEMO_MAXSIZE entries, which can be
+changed with the environment variable DAS_CACHE_SIZE. A capacity of 0
+disables caching, and a negative capacity means no bound. Resizing a cache
+empties it.
+'''
+
+import functools
+import os
+import threading
+
+MEMO_MAXSIZE = int(os.environ.get("DAS_CACHE_SIZE", 2**16))
+
+# name of the function -> memoized function
+_CACHES = {}
+
+
+class _LRUCache:
+    '''
+    Resizable LRU cache around fn, based on functools.lru_cache.
+    As lru_cache cannot be resized in place, resizing replaces it
+    by an empty cache, keeping the counters.
+    '''
+
+    def __init__(self, fn, maxsize):
+        self.fn = fn
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build(maxsize)
+
+    def build(self, maxsize):
+        self.maxsize = maxsize
+        self.cached = functools.lru_cache(
+            maxsize=None if maxsize < 0 else maxsize, typed=True)(self.fn)
+
+    def counters(self):
+        # every miss inserts one entry, so the entries that are
+        # no longer in the cache have been evicted
+        info = self.cached.cache_info()
+        evictions = info.misses - info.currsize if self.maxsize > 0 else 0
+        return (self.hits + info.hits, self.misses + info.misses,
+                self.evictions + evictions, info.currsize)
+
+    def retire(self):
+        (self.hits, self.misses, self.evictions, _) = self.counters()
+
+    def info(self):
+        with self.lock:
+            (hits, misses, evictions, size) = self.counters()
+        calls = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "size": size,
+            "maxsize": self.maxsize,
+            "hitrate": hits / calls if calls > 0 else 0.0,
+        }
+
+    def clear(self, stats=True):
+        with self.lock:
+            self.retire()
+            if stats:
+                self.hits = 0
+                self.misses = 0
+                self.evictions = 0
+            self.build(self.maxsize)
+
+    def resize(self, maxsize):
+        with self.lock:
+            self.retire()
+            self.build(maxsize)
+
+
+def memoize(fn=None, maxsize=None):
+    '''
+    Decorator adding a bounded LRU cache to a function with hashable
+    arguments. Can be used as @memoize or @memoize(maxsize=...).
+    The memoized function has the attributes cache_info, cache_clear,
+    cache_resize, and __wrapped__ (the original function).
+    '''
+    if fn is None:
+        return lambda fn: memoize(fn, maxsize)
+
+    cache = _LRUCache(fn, MEMO_MAXSIZE if maxsize is None else maxsize)
+
+    @functools.wraps(fn)
+    def memoized(*args, **kwargs):
+        return cache.cached(*args, **kwargs)
+
+    memoized.cache_info = cache.info
+    memoized.cache_clear = cache.clear
+    memoized.cache_resize = cache.resize
+    _CACHES[fn.__name__] = memoized
+    return memoized
+
+
+def _selected(names):
+    if names is None:
+        return list(_CACHES.values())
+    return [_CACHES[name] for name in names]
+
+
+def clearCaches(names=None, stats=True):
+    '''
+    Clear the caches of the given functions (default: all).
+    If stats is set, also reset the hit/miss/eviction counters.
+    '''
+    for memoized in _selected(names):
+        memoized.cache_clear(stats)
+
+
+def resizeCaches(maxsize, names=None):
+    '''
+    Set the capacity of the caches of the given functions (default: all).
+    This empties the caches (the counters are kept), so resize before a
+    sweep rather than during it.
+    '''
+    for memoized in _selected(names):
+        memoized.cache_resize(maxsize)
+
+
+def cacheStats():
+    '''
+    Return a dict mapping the name of every memoized function to its
+    counters (hits, misses, evictions, size, maxsize, hitrate).
+    '''
+    return {name: memoized.cache_info() for name, memoized in _CACHES.items()}
+
+
+def printCacheStats():
+    '''
+    Print the counters of all caches as a table.
+    '''
+    header = ["Function", "Hits", "Misses", "Evictions", "Size", "Hit rate"]
+    rows = [[name, str(s["hits"]), str(s["misses"]), str(s["evictions"]),
+             str(s["size"]), '{:.2%}'.format(s["hitrate"])]
+            for name, s in cacheStats().items()]
+    widths = [max(len(row[i]) for row in [header] + rows)
+              for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+'''
+SHA-256 Merkle trees over a byte buffer, to measure how long it takes
+to build the trees that the Merkle and FRI schemes commit with, and how
+long it takes to generate openings.
+
+Every leaf holds leafsize bytes of the buffer (e.g., a tuple of
+tuplesize field elements). There are two layouts:
+- as in sizeMerkleOpening (hashleaves=False): two neighbouring leaves
+  are hashed together, so an opening consists of the leaf, its sibling
+  leaf, and depth - 1 hashes,
+- as in makeMerkleScheme (hashleaves=True): every leaf is hashed on its
+  own, so an opening consists of the leaf and depth hashes.
+The number of leaves is padded with zero leaves to a power of two.
+
+Every level of the tree is stored in one preallocated bytearray. The
+nodes of a level are hashed by a pool of threads, each working on a
+contiguous range of nodes (hashlib releases the GIL for inputs larger
+than 2047 bytes, so this mostly helps for large leaves).
+
+Usage: python3 merkle.py [data size in MB ...]
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import hashlib
+import math
+import os
+import sys
+import time
+
+from schemes import *
+from fri import *
+
+DIGEST_SIZE = HASH_SIZE // 8
+
+# levels with fewer nodes than this are hashed by a single thread
+PARALLEL_MIN_NODES = 1024
+
+
+@dataclass
+class MerkleOpening:
+    index: int      # index of the leaf
+    leaf: bytes
+    sibling: bytes  # sibling leaf (b"" if leaves are hashed on their own)
+    copath: list    # sibling hashes from the bottom to the top
+
+    def size(self):
+        '''
+        Size of the opening in bits
+        '''
+        return 8 * (len(self.leaf) + len(self.sibling) + DIGEST_SIZE * len(self.copath))
+
+
+def _hashRange(src, width, dst, lo, hi):
+    '''
+    dst[i] = H(src[i]) for lo <= i < hi, where src
+    has nodes of width bytes and dst of DIGEST_SIZE bytes
+    '''
+    sha256 = hashlib.sha256
+    for i in range(lo, hi):
+        dst[DIGEST_SIZE * i:DIGEST_SIZE * (i + 1)] = \
+            sha256(src[width * i:width * (i + 1)]).digest()
+
+
+class MerkleTree:
+    def __init__(self, data, leafsize, hashleaves=False, workers=1):
+        '''
+        Build a Merkle tree over data (bytes-like) with leaves of
+        leafsize bytes, using workers threads to hash every level.
+        '''
+        numleafs = max(1, -(-len(data) // leafsize))
+        size = 1 << (numleafs - 1).bit_length()
+        if not hashleaves:
+            size = max(2, size)
+        self.leafsize = leafsize
+        self.hashleaves = hashleaves
+        self.numleafs = numleafs
+        self.leaves = bytearray(size * leafsize)
+        self.leaves[:len(data)] = data
+        self.levels = []
+
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            # the first level hashes single leaves or pairs of leaves
+            (src, width) = (memoryview(self.leaves), leafsize if hashleaves else 2 * leafsize)
+            nodes = size if hashleaves else size // 2
+            while True:
+                level = bytearray(nodes * DIGEST_SIZE)
+                self._hashLevel(pool, workers, src, width, memoryview(level), nodes)
+                self.levels.append(level)
+                if nodes == 1:
+                    break
+                (src, width, nodes) = (memoryview(level), 2 * DIGEST_SIZE, nodes // 2)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    @staticmethod
+    def _hashLevel(pool, workers, src, width, dst, nodes):
+        if pool is None or nodes < PARALLEL_MIN_NODES:
+            _hashRange(src, width, dst, 0, nodes)
+            return
+        step = -(-nodes // workers)
+        futures = [pool.submit(_hashRange, src, width, dst, lo, min(nodes, lo + step))
+                   for lo in range(0, nodes, step)]
+        for future in futures:
+            future.result()
+
+    def root(self):
+        return bytes(self.levels[-1])
+
+    def depth(self):
+        '''
+        Depth of the tree, i.e., log2 of the number of (padded) leaves
+        '''
+        return len(self.levels) - (1 if self.hashleaves else 0)
+
+    def _leaf(self, i):
+        return bytes(self.leaves[self.leafsize * i:self.leafsize * (i + 1)])
+
+    def _node(self, level, j):
+        return bytes(self.levels[level][DIGEST_SIZE * j:DIGEST_SIZE * (j + 1)])
+
+    def open(self, index):
+        '''
+        Opening of the leaf with the given index
+        '''
+        assert 0 <= index < self.numleafs
+        sibling = b"" if self.hashleaves else self._leaf(index ^ 1)
+        # index of the node containing the leaf on the first level
+        j = index if self.hashleaves else index >> 1
+        copath = []
+        for level in range(len(self.levels) - 1):
+            copath.append(self._node(level, j ^ 1))
+            j >>= 1
+        return MerkleOpening(index, self._leaf(index), sibling, copath)
+
+
+def verifyOpening(root, opening, hashleaves=False):
+    '''
+    Check an opening against the root of a tree
+    '''
+    sha256 = hashlib.sha256
+    (index, leaf) = (opening.index, opening.leaf)
+    if hashleaves:
+        (j, node) = (index, sha256(leaf).digest())
+    else:
+        pair = leaf + opening.sibling if index % 2 == 0 else opening.sibling + leaf
+        (j, node) = (index >> 1, sha256(pair).digest())
+    for sibling in opening.copath:
+        node = sha256(node + sibling if j % 2 == 0 else sibling + node).digest()
+        j >>= 1
+    return node == root
+
+
+def buildThroughput(data, leafsize, hashleaves=False, workers=1, repeat=3):
+    '''
+    Build a tree repeat times and return (tree, best throughput in MB/s)
+    '''
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tree = MerkleTree(data, leafsize, hashleaves, workers)
+        best = min(best, time.perf_counter() - start)
+    return (tree, (len(data) / 1000000) / best)
+
+
+def openingLatency(tree, openings=1000, seed=0):
+    '''
+    Average time in seconds to generate an opening for a random leaf
+    '''
+    import random
+    indices = random.Random(seed).choices(range(tree.numleafs), k=openings)
+    start = time.perf_counter()
+    for i in indices:
+        tree.open(i)
+    return (time.perf_counter() - start) / openings
+
+
+def schemeTrees(datasize):
+    '''
+    Trees committed to by the Merkle scheme and the first two trees of
+    the FRI scheme for datasize bits of data, as a list of
+    (name, data size in bytes, leaf size in bytes, hashleaves,
+    modelled size of an opening in bits)
+    '''
+    trees = []
+    merkle = makeMerkleScheme(datasize)
+    k = merkle.code.msg_len
+    trees.append(("merkle", k * merkle.code.size_code_symbol // 8,
+                  merkle.code.size_code_symbol // 8, True,
+                  merkle.code.size_code_symbol + merkle.opening_overhead))
+
+    fsize = 128
+    (batchsize, fanin, basedimension, r) = friSchemeParameters(datasize, fsize=fsize)
+    n = makeFRIScheme(datasize, fsize=fsize).code.codeword_len
+    if batchsize > 1:
+        trees.append(("fri batch", n * batchsize * fsize // 8, batchsize * fsize // 8, False,
+                      sizeMerkleOpening(n, batchsize, fsize)))
+    trees.append(("fri G_0", n * fsize // 8, fanin * fsize // 8, False,
+                  sizeMerkleOpening(n // fanin, fanin, fsize)))
+    return trees
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 8, 32]
+    workers = os.cpu_count() or 1
+    print("{:<10} {:<10} {:>12} {:>10} {:>10} {:>12} {:>12} {:>12}".format(
+        "tree", "data [MB]", "input [MB]", "leaf [B]", "MB/s",
+        "MB/s (" + str(workers) + "t)", "open [us]", "open [bits]"))
+    for size in sizes:
+        for (name, length, leafsize, hashleaves, modelled) in schemeTrees(int(size * 8000000)):
+            data = os.urandom(length)
+            (tree, throughput) = buildThroughput(data, leafsize, hashleaves, repeat=1)
+            (_, parallel) = buildThroughput(data, leafsize, hashleaves, workers, repeat=1)
+            latency = openingLatency(tree)
+            opening = tree.open(0)
+            assert verifyOpening(tree.root(), opening, hashleaves)
+            assert opening.size() == modelled
+            print("{:<10} {:<10} {:>12.2f} {:>10} {:>10.2f} {:>12.2f} {:>12.2f} {:>12}".format(
+                name, size, length / 1000000, leafsize, throughput, parallel,
+                latency * 1e6, opening.size()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+'''
+Simulation of the load that sampling light clients put on storage nodes.
+
+The encoding of the data is spread over a number of storage nodes
+(position p is stored on node p mod nodes). Every client starts at a
+uniformly random time within the arrival window, draws samples random
+positions (by default scheme.samples()), and requests the openings of
+comm_per_query() bits each from the nodes that store them. Requests
+reach a node after the one-way latency, every node sends its responses
+in FIFO order with its egress bandwidth, and the responses reach the
+client after the latency again.
+
+The simulation works on batches of events: the requests of one client
+to one node arrive at the same time and are served back to back, so
+they are one job whose service time is their number times the time to
+send one opening. The counts per node are drawn for a whole batch of
+clients at once, and every storage node is an asyncio task that
+receives the jobs of a batch (in order of arrival) and computes their
+departure times with a vectorized Lindley recursion
+D_i = max(A_i, D_{i-1}) + S_i
+= C_i + max(D_{-1}, max_{j <= i} (A_j - C_{j-1})), where C = cumsum(S).
+
+Usage: python3 netsim.py <scheme> <data size in MB> [options]
+'''
+
+from dataclasses import dataclass
+
+import argparse
+import asyncio
+
+import numpy as np
+
+from sweep import *
+
+
+@dataclass
+class NetworkConfig:
+    clients: int = 10000      # number of light clients
+    nodes: int = 100          # number of storage nodes
+    bandwidth: float = 1e9    # egress bandwidth of every node in bits per second
+    latency: float = 0.05     # one-way latency between clients and nodes in seconds
+    arrival: float = 1.0      # clients start uniformly at random within this many seconds
+    samples: int = None       # samples per client (default: scheme.samples())
+    batch: int = 1000         # number of clients per batch of events
+    pending: int = 4          # maximum number of batches in flight
+    seed: int = 0
+
+
+@dataclass
+class LoadResult:
+    egress: object      # bits sent by every node
+    requests: object    # openings sent by every node
+    busy: object        # time every node spent sending, in seconds
+    wait: object        # total queueing delay of the jobs of every node, in seconds
+    jobs: object        # number of jobs (client, node with at least one request) per node
+    completion: object  # time from start to receiving all openings, per client
+    delay: object       # largest queueing delay of the jobs of every client
+    makespan: float     # time until the last client is done
+
+    def summary(self):
+        lines = ["{:<28} {:>12} {:>12} {:>12} {:>12}".format(
+            "", "mean", "p50", "p99", "max")]
+
+        def row(name, values, scale=1.0):
+            lines.append("{:<28} {:>12.4g} {:>12.4g} {:>12.4g} {:>12.4g}".format(
+                name, np.mean(values) * scale, np.percentile(values, 50) * scale,
+                np.percentile(values, 99) * scale, np.max(values) * scale))
+        row("node egress [MB]", self.egress, 1 / 8000000)
+        row("node utilization", self.busy / self.makespan)
+        row("node queueing delay [ms]", self.wait / np.maximum(self.jobs, 1), 1000)
+        row("client completion [s]", self.completion)
+        row("client queueing delay [s]", self.delay)
+        lines.append("makespan {:.4g} s, total egress {:.4g} MB".format(
+            self.makespan, np.sum(self.egress) / 8000000))
+        return "\n".join(lines)
+
+
+def lindley(arrivals, services, free):
+    '''
+    Departure times of jobs with the given arrival times (in increasing
+    order) and service times at a FIFO server that is busy until free
+    '''
+    ends = np.cumsum(services)
+    starts = np.maximum(free, np.maximum.accumulate(arrivals - (ends - services)))
+    return ends + starts
+
+
+class StorageNode:
+    '''
+    Stand-in for a storage node, serving the jobs it receives
+    in batches through its queue
+    '''
+
+    def __init__(self, index, bandwidth, querysize):
+        self.index = index
+        self.bandwidth = bandwidth
+        self.querysize = querysize  # size of one opening in bits
+        self.free = 0.0     # time until which the node is busy
+        self.egress = 0.0
+        self.requests = 0
+        self.busy = 0.0
+        self.wait = 0.0
+        self.jobs = 0
+        self.queue = asyncio.Queue()
+
+    async def serve(self):
+        '''
+        Serve batches (arrivals, counts, future) until None is received.
+        The future is set to the departure times and queueing delays of the jobs.
+        '''
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            (arrivals, counts, future) = item
+            services = counts * (self.querysize / self.bandwidth)
+            departures = lindley(arrivals, services, self.free)
+            waits = departures - services - arrivals
+            if len(departures) > 0:
+                self.free = departures[-1]
+            self.egress += float(np.sum(counts)) * self.querysize
+            self.requests += int(np.sum(counts))
+            self.busy += float(np.sum(services))
+            self.wait += float(np.sum(waits))
+            self.jobs += len(arrivals)
+            future.set_result((departures, waits))
+
+
+def _nodeProbabilities(positions, nodes):
+    '''
+    Probability that a uniformly random position is on each node
+    '''
+    counts = np.full(nodes, positions // nodes, dtype=np.float64)
+    counts[:positions % nodes] += 1
+    return counts / positions
+
+
+async def _clientBatch(nodes, starts, samples, probabilities, latency, rng):
+    '''
+    Let a batch of clients (with the given start times, in increasing
+    order) sample, and return their completion times and queueing delays
+    '''
+    counts = rng.multinomial(samples, probabilities, size=len(starts))
+    departures = np.full(counts.shape, -np.inf)
+    waits = np.zeros(counts.shape)
+    loop = asyncio.get_running_loop()
+    futures = []
+    # all jobs of the batch are enqueued without awaiting in between,
+    # so every node receives the batches in order of arrival
+    for node in nodes:
+        mask = counts[:, node.index] > 0
+        future = loop.create_future()
+        node.queue.put_nowait((starts[mask] + latency, counts[mask, node.index], future))
+        futures.append((mask, future))
+    for node, (mask, future) in zip(nodes, futures):
+        (departures[mask, node.index], waits[mask, node.index]) = await future
+    return (np.max(departures, axis=1) + latency - starts, np.max(waits, axis=1))
+
+
+async def _simulate(scheme, config):
+    rng = np.random.default_rng(config.seed)
+    samples = config.samples if config.samples is not None else scheme.samples()
+    querysize = scheme.comm_per_query()
+    probabilities = _nodeProbabilities(scheme.encoding_length(), config.nodes)
+    starts = np.sort(rng.uniform(0, config.arrival, config.clients))
+
+    nodes = [StorageNode(i, config.bandwidth, querysize) for i in range(config.nodes)]
+    servers = [asyncio.create_task(node.serve()) for node in nodes]
+
+    # batches are started in order of their start times, and at most
+    # config.pending of them are in flight at any time
+    batches = []
+    inflight = set()
+    for i in range(0, config.clients, config.batch):
+        if len(inflight) >= config.pending:
+            (_, inflight) = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        batch = asyncio.create_task(_clientBatch(
+            nodes, starts[i:i + config.batch], samples, probabilities,
+            config.latency, rng))
+        batches.append(batch)
+        inflight.add(batch)
+    if inflight:
+        await asyncio.wait(inflight)
+    for node in nodes:
+        node.queue.put_nowait(None)
+    await asyncio.gather(*servers)
+
+    completion = np.concatenate([b.result()[0] for b in batches] or [np.zeros(0)])
+    delay = np.concatenate([b.result()[1] for b in batches] or [np.zeros(0)])
+    return LoadResult(
+        egress=np.array([n.egress for n in nodes]),
+        requests=np.array([n.requests for n in nodes]),
+        busy=np.array([n.busy for n in nodes]),
+        wait=np.array([n.wait for n in nodes]),
+        jobs=np.array([n.jobs for n in nodes]),
+        completion=completion,
+        delay=delay,
+        makespan=float(np.max(starts + completion)) if config.clients > 0 else 0.0)
+
+
+def simulateLoad(scheme, config=None):
+    '''
+    Simulate config.clients clients sampling the encoding of scheme
+    from config.nodes storage nodes, and return a LoadResult
+    '''
+    return asyncio.run(_simulate(scheme, config or NetworkConfig()))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate light clients sampling from storage nodes.")
+    parser.add_argument("scheme", choices=list(SCHEMES), help="name of the scheme")
+    parser.add_argument("datasize", type=float, help="data size in MB")
+    parser.add_argument("--clients", type=int, default=NetworkConfig.clients)
+    parser.add_argument("--nodes", type=int, default=NetworkConfig.nodes)
+    parser.add_argument("--bandwidth", type=float, default=NetworkConfig.bandwidth / 1e6,
+                        help="egress bandwidth per node in Mbit/s")
+    parser.add_argument("--latency", type=float, default=NetworkConfig.latency * 1000,
+                        help="one-way latency in ms")
+    parser.add_argument("--arrival", type=float, default=NetworkConfig.arrival,
+                        help="clients start within this many seconds")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="samples per client (default: the samples of the scheme)")
+    parser.add_argument("--batch", type=int, default=NetworkConfig.batch,
+                        help="number of clients per batch of events")
+    parser.add_argument("--seed", type=int, default=NetworkConfig.seed)
+    args = parser.parse_args()
+
+    scheme = SCHEMES[args.scheme](int(args.datasize * 8000000))
+    config = NetworkConfig(clients=args.clients, nodes=args.nodes,
+                           bandwidth=args.bandwidth * 1e6, latency=args.latency / 1000,
+                           arrival=args.arrival, samples=args.samples,
+                           batch=args.batch, seed=args.seed)
+    print("{} clients, {} nodes, {} samples of {:.2f} KB per client".format(
+        config.clients, config.nodes,
+        config.samples if config.samples is not None else scheme.samples(),
+        scheme.comm_per_query() / 8000))
+    print(simulateLoad(scheme, config).summary())
+
+
+if __name__ == "__main__":
+    main()
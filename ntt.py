@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+'''
+Reed-Solomon encoding via a number theoretic transform (NTT) over small
+prime fields, to measure the time it takes to compute the encodings
+whose sizes the schemes model.
+
+Data (a byte string) is split into field elements, which are arranged
+as ell messages of k elements each, i.e., an interleaved Reed-Solomon
+code as used by the FRI and hash-based schemes. Every message is the
+coefficient vector of a polynomial of degree < k, and its codeword
+consists of its evaluations at the first n elements of a multiplicative
+subgroup of order N, where N is the smallest power of two >= n.
+All transforms are vectorized with NumPy uint64 arithmetic:
+- Goldilocks (p = 2^64 - 2^32 + 1): products are computed from 32-bit
+  limbs and reduced using 2^64 = 2^32 - 1 and 2^96 = -1 mod p,
+- BabyBear (p = 15 * 2^27 + 1): elements are kept in Montgomery form
+  with R = 2^32, as products of two elements fit into 64 bits.
+
+Usage: python3 ntt.py [data size in MB ...]
+'''
+
+import math
+import sys
+import time
+import numpy as np
+
+from schemes import *
+from fri import *
+
+MASK32 = np.uint64(2**32 - 1)
+
+# maximum number of field elements per transform call,
+# interleaved messages are encoded in chunks of rows
+CHUNK_ELEMENTS = 2**22
+
+
+class Goldilocks:
+    name = "Goldilocks"
+    modulus = 2**64 - 2**32 + 1
+    generator = 7
+    two_adicity = 32
+    element_bytes = 7   # bytes of data per field element
+
+    P = np.uint64(modulus)
+    EPS = np.uint64(2**32 - 1)  # 2^64 mod p
+
+    def fromInts(self, a):
+        return np.asarray(a, dtype=np.uint64) % self.P
+
+    def toInts(self, a):
+        return a
+
+    def add(self, a, b):
+        s = a + b
+        s += (s < a) * self.EPS
+        return np.where(s >= self.P, s - self.P, s)
+
+    def sub(self, a, b):
+        d = a - b
+        d -= (a < b) * self.EPS
+        return d
+
+    def mul(self, a, b):
+        (a0, a1) = (a & MASK32, a >> np.uint64(32))
+        (b0, b1) = (b & MASK32, b >> np.uint64(32))
+        # 128-bit product hi * 2^64 + lo
+        mid = a0 * b1
+        mid2 = a1 * b0
+        mid += mid2
+        midcarry = (mid < mid2).astype(np.uint64)
+        lo = a0 * b0
+        lo2 = lo + (mid << np.uint64(32))
+        hi = a1 * b1 + (mid >> np.uint64(32)) + (lo2 < lo) + (midcarry << np.uint64(32))
+        # reduce lo + 2^64 * h0 + 2^96 * h1 = lo + EPS * h0 - h1
+        (h0, h1) = (hi & MASK32, hi >> np.uint64(32))
+        t = lo2 - h1
+        t -= (lo2 < h1) * self.EPS
+        u = h0 * self.EPS
+        r = t + u
+        r += (r < u) * self.EPS
+        return np.where(r >= self.P, r - self.P, r)
+
+
+class BabyBear:
+    name = "BabyBear"
+    modulus = 15 * 2**27 + 1
+    generator = 31
+    two_adicity = 27
+    element_bytes = 3   # bytes of data per field element
+
+    P = np.uint64(modulus)
+    # -p^{-1} mod 2^32
+    PINV = np.uint64((-pow(modulus, -1, 2**32)) % 2**32)
+
+    def fromInts(self, a):
+        # to Montgomery form a * 2^32 mod p
+        a = np.asarray(a, dtype=np.uint64) % self.P
+        return (a << np.uint64(32)) % self.P
+
+    def toInts(self, a):
+        return self.mul(a, np.uint64(1))
+
+    def add(self, a, b):
+        s = a + b
+        return np.where(s >= self.P, s - self.P, s)
+
+    def sub(self, a, b):
+        d = a - b
+        return np.where(a < b, d + self.P, d)
+
+    def mul(self, a, b):
+        # Montgomery multiplication: a * b / 2^32 mod p
+        x = a * b
+        m = ((x & MASK32) * self.PINV) & MASK32
+        r = (x + m * self.P) >> np.uint64(32)
+        return np.where(r >= self.P, r - self.P, r)
+
+
+FIELDS = {"goldilocks": Goldilocks(), "babybear": BabyBear()}
+
+
+def rootOfUnity(field, order):
+    '''
+    Element of multiplicative order order (a power of two) as an int
+    '''
+    assert order & (order - 1) == 0 and order <= 2**field.two_adicity
+    p = field.modulus
+    return pow(field.generator, (p - 1) // order, p)
+
+
+def _powers(field, w, count):
+    '''
+    Field elements w^0, ..., w^{count-1}, computed by repeated doubling
+    '''
+    powers = field.fromInts([1])
+    while len(powers) < count:
+        step = field.fromInts([pow(w, len(powers), field.modulus)])
+        powers = np.concatenate([powers, field.mul(powers, step)])
+    return powers[:count]
+
+
+def _bitReversal(size):
+    bits = size.bit_length() - 1
+    index = np.arange(size)
+    reversed_index = np.zeros(size, dtype=np.int64)
+    for b in range(bits):
+        reversed_index |= ((index >> b) & 1) << (bits - 1 - b)
+    return reversed_index
+
+
+def ntt(field, a):
+    '''
+    Evaluate the polynomials with coefficient vectors a[i, :] at all
+    powers of a root of unity of order a.shape[1] (a power of two).
+    a is an array of field elements of shape (rows, size).
+    '''
+    size = a.shape[1]
+    a = a[:, _bitReversal(size)]
+    twiddles = _powers(field, rootOfUnity(field, size), max(1, size // 2))
+    half = 1
+    while half < size:
+        blocks = a.reshape(a.shape[0], size // (2 * half), 2, half)
+        w = twiddles[::size // (2 * half)]
+        u = blocks[:, :, 0, :]
+        v = field.mul(blocks[:, :, 1, :], w)
+        a = np.stack([field.add(u, v), field.sub(u, v)], axis=2)
+        half *= 2
+    return a.reshape(-1, size)
+
+
+def bytesToElements(field, data):
+    '''
+    Split a byte string into field elements of field.element_bytes bytes
+    each (little endian, the last one padded with zeros)
+    '''
+    width = field.element_bytes
+    count = -(-len(data) // width)
+    padded = np.zeros(count * width, dtype=np.uint8)
+    padded[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    buffer = np.zeros((count, 8), dtype=np.uint8)
+    buffer[:, :width] = padded.reshape(count, width)
+    return field.fromInts(buffer.view("<u8").reshape(-1))
+
+
+assert all(FIELDS[f].toInts(bytesToElements(FIELDS[f], bytes(range(1, 33)))).tolist() ==
+           [int.from_bytes(bytes(range(1, 33))[i:i + FIELDS[f].element_bytes], "little")
+            for i in range(0, 32, FIELDS[f].element_bytes)] for f in FIELDS)
+
+
+def messageShape(field, datasize, k):
+    '''
+    Number of interleaved messages of length k needed
+    for datasize bits of data
+    '''
+    elements = math.ceil(datasize / (8 * field.element_bytes))
+    return (math.ceil(elements / k), k)
+
+
+def rsEncodeChunks(field, data, k, n):
+    '''
+    Reed-Solomon encode data (bytes) as interleaved messages of length k
+    into codewords of length n. Yields the codewords in chunks of rows,
+    as arrays of shape (rows, n).
+    '''
+    assert k <= n
+    size = 1 << (n - 1).bit_length()
+    elements = bytesToElements(field, data)
+    ell = -(-len(elements) // k)
+    messages = np.zeros(ell * k, dtype=np.uint64)
+    messages[:len(elements)] = elements
+    messages = messages.reshape(ell, k)
+    rows = max(1, CHUNK_ELEMENTS // size)
+    for i in range(0, ell, rows):
+        chunk = np.zeros((min(rows, ell - i), size), dtype=np.uint64)
+        chunk[:, :k] = messages[i:i + rows]
+        yield ntt(field, chunk)[:, :n]
+
+
+def rsEncode(field, data, k, n):
+    '''
+    Reed-Solomon encode data (bytes) as interleaved messages of length k
+    into codewords of length n. Returns an array of shape (ell, n).
+    '''
+    return np.concatenate(list(rsEncodeChunks(field, data, k, n)))
+
+
+def encodingThroughput(field, datasize, k, n, repeat=3, seed=0):
+    '''
+    Encode datasize bits of random data with codewords of length n and
+    messages of length k. Returns the best throughput in MB of data per
+    second out of repeat runs.
+    '''
+    data = np.random.default_rng(seed).bytes(datasize // 8)
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in rsEncodeChunks(field, data, k, n):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return (datasize / 8000000) / best
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    print("{:<8} {:<10} {:<10} {:>10} {:>10} {:>8} {:>10}".format(
+        "scheme", "field", "data [MB]", "k", "n", "rows", "MB/s"))
+    for size in sizes:
+        datasize = int(size * 8000000)
+        for (name, scheme) in [("fri", makeFRIScheme(datasize)),
+                               ("hash", makeHashBasedScheme(datasize))]:
+            (k, n) = (scheme.code.msg_len, scheme.code.codeword_len)
+            for field in FIELDS.values():
+                (ell, _) = messageShape(field, datasize, k)
+                throughput = encodingThroughput(field, datasize, k, n)
+                print("{:<8} {:<10} {:<10} {:>10} {:>10} {:>8} {:>10.2f}".format(
+                    name, field.name, size, k, n, ell, throughput))
+
+
+if __name__ == "__main__":
+    main()
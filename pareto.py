@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+'''
+Pareto frontier of the FRI scheme over its parameters.
+
+friGoodParameters picks one choice of batch size, fan-in, and base
+dimension for a fixed inverse rate and field size. Here, we evaluate
+all choices of (invrate, fsize, fanin, basedimension, batchsize) in the
+ranges FRI_INVRATE_RANGE, FRI_FSIZE_RANGE, FRI_FANIN_RANGE,
+FRI_BASEDIMENSION_RANGE and up to FRI_MAX_BATCHSIZE, and return those
+that are not dominated in the metrics PARETO_METRICS (all minimized).
+
+For fixed invrate, fsize, fanin and basedimension, all these metrics are
+increasing in the batch size as long as the number of rounds does not
+change, so only the batch sizes from friBatchsizeCandidates (the
+smallest batch size for every number of rounds) are evaluated.
+Choices that are not sound (e.g., because the field is too small for
+the domain) fail in makeFRIScheme and are skipped.
+
+Usage: python3 pareto.py <data size in MB> [-j workers]
+'''
+
+import argparse
+
+from fri import *
+from sweep import *
+from instrument import recordSearch
+
+# metrics (names in METRICS) for which the frontier is computed
+PARETO_METRICS = ("com_size", "comm_per_query", "total_comm", "encoding_size")
+
+
+def friParameterPoints(datasize, invrates=FRI_INVRATE_RANGE, fsizes=FRI_FSIZE_RANGE,
+                       fanins=FRI_FANIN_RANGE, basedimensions=FRI_BASEDIMENSION_RANGE,
+                       maxbatchsize=FRI_MAX_BATCHSIZE):
+    '''
+    Sweep points of the FRI scheme for all parameters that can be
+    on the Pareto frontier
+    '''
+    points = []
+    for invrate in invrates:
+        for fsize in fsizes:
+            minfe = math.ceil(datasize / fsize)
+            for fanin in fanins:
+                for basedimension in basedimensions:
+                    candidates = friBatchsizeCandidates(
+                        minfe, fanin, basedimension, maxbatchsize)
+                    recordSearch("friParameterPoints", evaluated=len(candidates),
+                                 pruned=maxbatchsize - len(candidates))
+                    for batchsize in candidates:
+                        points.append(makePoint(
+                            "fri", datasize, invrate=invrate, fsize=fsize,
+                            fanin=fanin, basedimension=basedimension,
+                            batchsize=batchsize))
+    return points
+
+
+def dominates(a, b):
+    '''
+    Whether a dominates b, i.e., a <= b in every entry
+    and a < b in at least one entry
+    '''
+    return all(x <= y for x, y in zip(a, b)) and a != b
+
+
+def paretoFrontier(values):
+    '''
+    Indices of the values (tuples, all entries minimized) that are not
+    dominated by any other value, in increasing order. Of several equal
+    values, only the first one is kept.
+    '''
+    # a value can only be dominated by values that come before it in
+    # lexicographic order, so one pass over the sorted values suffices
+    order = sorted(range(len(values)), key=lambda i: (values[i], i))
+    frontier = []
+    for i in order:
+        if not any(values[j] == values[i] or dominates(values[j], values[i])
+                   for j in frontier):
+            frontier.append(i)
+    return sorted(frontier)
+
+
+def friParetoFrontier(datasize, metrics=PARETO_METRICS, workers=1,
+                      backend="process", store=None, **ranges):
+    '''
+    Evaluate all points from friParameterPoints(datasize, **ranges) with
+    runSweep and return a SweepResult with the points on the Pareto
+    frontier for the given metrics. The errors of the result are the
+    points that could not be evaluated, i.e., parameters that are not sound.
+    '''
+    result = runSweep(friParameterPoints(datasize, **ranges), workers=workers,
+                      backend=backend, store=store)
+    evaluated = list(result)
+    columns = [METRICS.index(m) for m in metrics]
+    values = [tuple(m[c] for c in columns) for _, m in evaluated]
+    frontier = [evaluated[i] for i in paretoFrontier(values)]
+    recordSearch("paretoFrontier", evaluated=len(values), pruned=len(values) - len(frontier))
+    return SweepResult(points=[p for p, _ in frontier],
+                       metrics=[m for _, m in frontier],
+                       errors=result.errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Print the Pareto frontier of the FRI scheme over its parameters.")
+    parser.add_argument("datasize", type=float, help="data size in MB")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of parallel workers (default: 1, 0 for all cores)")
+    parser.add_argument("--backend", choices=BACKENDS, default="process",
+                        help="use a process pool or a thread pool (for free-threaded Python)")
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else defaultWorkers()
+
+    result = friParetoFrontier(int(args.datasize * 8000000),
+                               workers=workers, backend=args.backend)
+    print("{:>7} {:>5} {:>5} {:>8} {:>5}   {:>10} {:>16} {:>15} {:>15}".format(
+        "invrate", "fsize", "fanin", "basedim", "batch", "|com| [KB]",
+        "Comm. p. Q. [KB]", "Comm Total [MB]", "|Encoding| [MB]"))
+    for point, metrics in result:
+        p = point.kwargs()
+        (com_size, comm_per_query, total_comm, encoding_size) = metrics[:4]
+        print("{:>7} {:>5} {:>5} {:>8} {:>5}   {:>10.2f} {:>16.2f} {:>15.2f} {:>15.2f}".format(
+            p["invrate"], p["fsize"], p["fanin"], p["basedimension"], p["batchsize"],
+            com_size / 8000, comm_per_query / 8000, total_comm / 8000000,
+            encoding_size / 8000000))
+    print(str(len(result.points)) + " points on the frontier, " +
+          str(len(result.errors)) + " parameter choices are not sound")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 
 from codes import *
-from dataclasses import dataclass
+from costs import *
+from dataclasses import dataclass, field, replace
+from functools import partial
 import math
 
 # Some constants.
@@ -22,6 +24,11 @@ class Scheme:
     code: Code            # code that is used
     com_size: int         # size of commitment in bits
     opening_overhead: int  # overhead of opening a symbol in the encoding
+    # operation counts of the prover, verifier, and decoder
+    costs: SchemeCosts = field(default_factory=SchemeCosts)
+    # function mapping the number of samples to the total communication
+    # in bits if the openings are sent as one Merkle multiproof, or None
+    multiproof_comm: object = None
 
     def samples(self):
         '''
@@ -36,6 +43,16 @@ class Scheme:
         '''
         return self.comm_per_query() * self.samples()
 
+    def total_comm_multiproof(self):
+        '''
+        Compute the total communication in bits, if all openings are sent
+        together and nodes shared by the Merkle paths are only sent once
+        (expected value). Same as total_comm if the scheme has no Merkle trees.
+        '''
+        if self.multiproof_comm is None:
+            return self.total_comm()
+        return self.multiproof_comm(self.samples())
+
     def comm_per_query(self):
         '''
         Compute the communication per query in bits.
@@ -60,6 +77,84 @@ class Scheme:
         '''
         return self.code.codeword_len
 
+    def prover_time(self, profile=None):
+        '''
+        Estimated time in seconds to encode the data, compute
+        the commitment, and compute the openings of all symbols.
+        '''
+        return (profile or DEFAULT_PROFILE).time(self.costs.prover)
+
+    def verifier_time(self, profile=None):
+        '''
+        Estimated time in seconds to verify the opening of one sample.
+        '''
+        return (profile or DEFAULT_PROFILE).time(self.costs.verifier)
+
+    def decoder_time(self, profile=None):
+        '''
+        Estimated time in seconds to reconstruct the data from the samples.
+        '''
+        return (profile or DEFAULT_PROFILE).time(self.costs.decoder)
+
+    def with_exact_samples(self):
+        '''
+        Returns a copy of this scheme using Code.with_exact_samples
+        '''
+        return replace(self, code=self.code.with_exact_samples())
+
+
+def expectedOpened(m, samples):
+    '''
+    Expected number of distinct nodes out of m nodes
+    that are hit by samples uniformly random leaves
+    '''
+    return -m * math.expm1(samples * math.log1p(-1.0 / m)) if m > 1 else min(1, samples)
+
+
+def expectedCopath(m, samples):
+    '''
+    Expected number of distinct co-path nodes (nodes that are not hit
+    but whose sibling is) out of m nodes of one level of a binary tree,
+    for samples uniformly random leaves. This is
+    m * ((1-1/m)^samples - (1-2/m)^samples).
+    '''
+    if m <= 1 or samples == 0:
+        return 0
+    a = samples * math.log1p(-1.0 / m)
+    if m == 2:
+        return m * math.exp(a)
+    b = samples * math.log1p(-2.0 / m)
+    return -m * math.exp(a) * math.expm1(b - a)
+
+
+def merkleMultiproofSize(numleafs, leafsize, samples, hashleaves=False):
+    '''
+    Expected size in bits of the nodes needed to authenticate samples
+    uniformly random leaves (not counting the leaves themselves) of a
+    Merkle tree with numleafs leaves (padded to a power of two) of size
+    leafsize. If hashleaves, every leaf is hashed on its own (as in
+    makeMerkleScheme), otherwise two sibling leaves are hashed together
+    and sibling leaves are sent instead of their hash (as in
+    sizeMerkleOpening). For samples = 1, this is the size of one path.
+    '''
+    m = 2 ** math.ceil(math.log2(numleafs))
+    size = 0
+    if not hashleaves:
+        size += expectedCopath(m, samples) * leafsize
+        m //= 2
+    while m > 1:
+        size += expectedCopath(m, samples) * HASH_SIZE
+        m //= 2
+    return size
+
+
+def merkleMultiproofComm(k, chunksize, samples):
+    '''
+    Total communication of the Merkle scheme with multiproofs
+    '''
+    return (samples * (math.log2(k) + chunksize)
+            + merkleMultiproofSize(k, chunksize, samples, hashleaves=True))
+
 
 def makeNaiveScheme(datasize):
     '''
@@ -76,7 +171,11 @@ def makeNaiveScheme(datasize):
             samples=1
         ),
         com_size=HASH_SIZE,
-        opening_overhead=0
+        opening_overhead=0,
+        costs=SchemeCosts(
+            prover=OpCounts(hashbytes=datasize / 8),
+            verifier=OpCounts(hashbytes=datasize / 8),
+        )
     )
 
 
@@ -90,7 +189,12 @@ def makeMerkleScheme(datasize, chunksize=1024):
     return Scheme(
         code=makeTrivialCode(chunksize, k),
         com_size=HASH_SIZE,
-        opening_overhead=math.ceil(math.log(k, 2))*HASH_SIZE
+        opening_overhead=math.ceil(math.log(k, 2))*HASH_SIZE,
+        costs=SchemeCosts(
+            prover=merkleTreeCounts(k, chunksize),
+            verifier=merklePathCounts(k, chunksize),
+        ),
+        multiproof_comm=partial(merkleMultiproofComm, k, chunksize)
     )
 
 
@@ -100,68 +204,139 @@ def makeKZGScheme(datasize, invrate=4):
     The RS Code is set to have parameters k,n with n = invrate * k
     '''
     k = math.ceil(datasize / BLS_FE_SIZE)
+    n = k * invrate
     return Scheme(
         code=makeRSCode(
             BLS_FE_SIZE,
             k,
-            k * invrate
+            n
         ),
         com_size=BLS_GE_SIZE,
         opening_overhead=BLS_GE_SIZE,
+        costs=SchemeCosts(
+            # interpolate, evaluate, commit, and compute all proofs
+            prover=nttCounts(k, BLS_FE_SIZE) + nttCounts(n, BLS_FE_SIZE)
+            + msmCounts(k) + kzgAllProofsCounts(k, n),
+            verifier=kzgVerifyCounts(),
+            decoder=decodeCounts(k, BLS_FE_SIZE),
+        )
     )
 
 
-def makeTensorScheme(datasize, invrate=2):
+def ceilRoot(m, d):
+    '''
+    Smallest integer k with k^d >= m
+    '''
+    if d == 2:
+        return math.ceil(math.sqrt(m))
+    k = math.ceil(m ** (1.0 / d))
+    while k > 1 and (k - 1) ** d >= m:
+        k -= 1
+    while k ** d < m:
+        k += 1
+    return k
+
+
+def makeTensorScheme(datasize, invrate=2, dims=2):
     '''
     Tensor Code Commitment, where each dimension is expanded with inverse rate invrate.
     That is, data is a k x k matrix, and the codeword is a n x n matrix, with n = invrate * k
     Both column and row code are RS codes.
+    With dims > 2, data is a k x ... x k array with dims dimensions, and the codeword
+    is the n x ... x n array of the dims-fold tensor product of the RS code (see
+    makeTensorCode). The commitment consists of PST (multivariate KZG) commitments
+    to the k slices of the data along the first dimension, and the opening of a
+    symbol is a PST proof with one group element per remaining dimension.
     '''
+    assert dims >= 2
     m = math.ceil(datasize / BLS_FE_SIZE)
-    k = math.ceil(math.sqrt(m))
+    k = ceilRoot(m, dims)
     n = invrate * k
 
     rs = makeRSCode(BLS_FE_SIZE, k, n)
 
+    # number of lines along the j-th dimension that are encoded (the
+    # dimensions before j are already extended), and of extended slices
+    lines = sum(n ** j * k ** (dims - 1 - j) for j in range(dims))
+    slices = n ** (dims - 2)
+
     return Scheme(
-        code=rs.tensor(rs),
+        code=rs.tensor(rs) if dims == 2 else makeTensorCode([rs] * dims),
         com_size=BLS_GE_SIZE * k,
-        opening_overhead=BLS_GE_SIZE,
+        opening_overhead=BLS_GE_SIZE * (dims - 1),
+        costs=SchemeCosts(
+            # encode all lines, commit to k slices, and compute all proofs
+            # for each of the n extended slices, per remaining dimension
+            prover=lines * nttCounts(n, BLS_FE_SIZE) + k * msmCounts(k ** (dims - 1))
+            + n * (dims - 1) * slices * kzgAllProofsCounts(k, n),
+            # the commitment to an extended slice is a combination of the k slice commitments
+            verifier=msmCounts(k) + (dims - 1) * kzgVerifyCounts(),
+            decoder=lines * decodeCounts(k, BLS_FE_SIZE),
+        )
     )
 
 
-def makeHashBasedScheme(datasize, fsize=32, P=8, L=64, invrate=4):
+def makeHashBasedScheme(datasize, fsize=32, P=8, L=64, invrate=4, rows=None):
     '''
     Hash-Based Code Commitment over field with elements of size fsize,
-    parallel repetition parameters P and L. Data is treated as a k x k matrix,
-    and codewords are k x n matrices, where n = k*invrate.
+    parallel repetition parameters P and L. Data is treated as a rows x k
+    matrix (by default k x k), and codewords are rows x n matrices, where n = k*invrate.
     '''
     m = math.ceil(datasize / fsize)
-    k = math.ceil(math.sqrt(m))
+    if rows is None:
+        # square matrix
+        k = rows = math.ceil(math.sqrt(m))
+    else:
+        k = math.ceil(m / rows)
     n = invrate * k
     rs = makeRSCode(fsize, k, n)
 
     return Scheme(
-        code=rs.interleave(k),
+        code=rs.interleave(rows),
         com_size=n * HASH_SIZE + P * n * fsize + L * k * fsize,
         opening_overhead=0,
+        costs=SchemeCosts(
+            # encode the rows, hash n columns, and compute
+            # P + L random combinations of the rows (encoding P of them)
+            prover=rows * nttCounts(n, fsize) + OpCounts(hashbytes=n * rows * fsize / 8)
+            + OpCounts(fmul=(P + L) * rows * k * fieldMults(fsize)) + P * nttCounts(n, fsize),
+            # hash the column and check it against all combinations
+            verifier=OpCounts(hashbytes=rows * fsize / 8,
+                              fmul=(P + L) * rows * fieldMults(fsize)),
+            decoder=rows * decodeCounts(k, fsize),
+        )
     )
 
 
-def makeHomHashBasedScheme(datasize, P=2, L=2, invrate=4):
+def makeHomHashBasedScheme(datasize, P=2, L=2, invrate=4, rows=None):
     '''
     Homomorphic Hash-Based Code Commitment instantiated with Pedersen Hash and
-    parallel repetition parameters P and L. Data is treated as a k x k matrix,
-    and codewords are k x n matrices, where n = k*invrate.
+    parallel repetition parameters P and L. Data is treated as a rows x k
+    matrix (by default k x k), and codewords are rows x n matrices, where n = k*invrate.
     '''
     m = math.ceil(datasize / PEDERSEN_FE_SIZE)
-    k = math.ceil(math.sqrt(m))
+    if rows is None:
+        # square matrix
+        k = rows = math.ceil(math.sqrt(m))
+    else:
+        k = math.ceil(m / rows)
     n = invrate * k
     rs = makeRSCode(PEDERSEN_FE_SIZE, k, n)
 
     return Scheme(
-        code=rs.interleave(k),
+        code=rs.interleave(rows),
         com_size=n * PEDERSEN_GE_SIZE + P * n *
         PEDERSEN_FE_SIZE + L * k * PEDERSEN_FE_SIZE,
         opening_overhead=0,
+        costs=SchemeCosts(
+            # encode the rows, hash n columns, and compute
+            # P + L random combinations of the rows (encoding P of them)
+            prover=rows * nttCounts(n, PEDERSEN_FE_SIZE) + n * msmCounts(rows)
+            + OpCounts(fmul=(P + L) * rows * k * fieldMults(PEDERSEN_FE_SIZE))
+            + P * nttCounts(n, PEDERSEN_FE_SIZE),
+            # hash the column and check it against all combinations
+            verifier=msmCounts(rows)
+            + OpCounts(fmul=(P + L) * rows * fieldMults(PEDERSEN_FE_SIZE)),
+            decoder=rows * decodeCounts(k, PEDERSEN_FE_SIZE),
+        )
     )
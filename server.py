@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+'''
+Long-running HTTP service answering metric queries for the schemes, so
+that tools do not pay interpreter startup and cold caches per query.
+
+A query is a JSON object {"scheme": name in SCHEMES, "datasize": bits,
+"params": {keyword parameters}}; instead of "datasize", "mb" gives the
+data size in MB as for table.py. The endpoints are:
+
+    GET  /schemes              names of the schemes and of the METRICS
+    GET  /evaluate?scheme=fri&mb=32&invrate=8
+    POST /evaluate             one query
+    POST /batch                {"queries": [query, ...]}
+    GET  /stats                size, hits, misses and coalesced queries of the cache
+
+and the answer to a query is {"scheme", "datasize", "params", "metrics":
+{name: value}} or {"scheme", "datasize", "params", "error"} if the
+scheme cannot be instantiated with these parameters.
+
+Results are kept in an in-memory cache (MetricsCache). Identical queries
+that arrive while one of them is being evaluated wait for that
+evaluation instead of repeating it. The points of a batch that are not
+cached are evaluated together with runSweep, i.e., in parallel with -j,
+by a pool of worker processes that is kept for the lifetime of the server.
+
+Usage: python3 server.py [-h] [--host HOST] [--port PORT] [--unix PATH]
+                         [-j WORKERS] [--cache-size N]
+'''
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlsplit, parse_qsl
+
+import argparse
+import json
+import math
+import os
+import socket
+import threading
+import traceback
+
+from sweep import *
+
+MB = 8000000
+
+# maximum number of points kept in the cache
+DEFAULT_CACHE_SIZE = 1000000
+
+
+# names that are not keyword parameters of the schemes
+RESERVED_PARAMS = frozenset(("scheme", "datasize", "mb"))
+
+
+class QueryError(Exception):
+    '''
+    A query that is malformed (answered with status 400)
+    '''
+    pass
+
+
+def parseQuery(query):
+    '''
+    SweepPoint of a query (a dict as described above)
+    '''
+    if not isinstance(query, dict):
+        raise QueryError("a query must be a JSON object")
+    scheme = query.get("scheme")
+    if scheme not in SCHEMES:
+        raise QueryError("unknown scheme " + str(scheme))
+    if "datasize" in query:
+        datasize = query["datasize"]
+    elif "mb" in query:
+        mb = query["mb"]
+        if isinstance(mb, str):
+            try:
+                mb = float(mb)
+            except ValueError:
+                raise QueryError("mb must be a number")
+        if isinstance(mb, bool) or not isinstance(mb, (int, float)) or not math.isfinite(mb):
+            raise QueryError("mb must be a number")
+        datasize = int(mb * MB)
+    else:
+        raise QueryError("a query needs a datasize (in bits) or mb")
+    if isinstance(datasize, bool) or not isinstance(datasize, int) or datasize <= 0:
+        raise QueryError("the datasize must be a positive integer")
+    params = query.get("params", {})
+    if not isinstance(params, dict) or \
+            any(isinstance(v, (list, dict)) for v in params.values()):
+        raise QueryError("params must be an object with scalar values")
+    reserved = RESERVED_PARAMS.intersection(params)
+    if reserved:
+        raise QueryError("reserved names in params: " + ", ".join(sorted(reserved)))
+    return makePoint(scheme, datasize, **params)
+
+
+def answer(point, outcome):
+    '''
+    JSON answer for a point and its outcome (metrics, error) of evaluatePoint
+    '''
+    (metrics, error) = outcome
+    result = {"scheme": point.scheme, "datasize": point.datasize,
+              "params": point.kwargs()}
+    if error is None:
+        result["metrics"] = dict(zip(METRICS, metrics))
+    else:
+        result["error"] = error[0]
+    return result
+
+
+class MetricsCache:
+    '''
+    Cache of the outcomes (as returned by evaluatePoint) of sweep points,
+    keeping the maxsize most recently used points. Concurrent requests
+    for the same point are coalesced: only the first evaluates it, and
+    the others wait for its result.
+    '''
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, workers=1, executor=None):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.executor = executor  # pool kept across requests (None: one per batch)
+        self.outcomes = OrderedDict()  # point -> outcome
+        self.pending = {}              # point -> Future of the outcome
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _claim(self, points):
+        '''
+        Returns (outcomes, waiting, claimed): the cached outcomes (None if
+        not cached), the futures of points evaluated by other requests, and
+        the points that this request has to evaluate
+        '''
+        outcomes = [None] * len(points)
+        waiting = {}
+        claimed = {}
+        with self.lock:
+            for i, point in enumerate(points):
+                outcome = self.outcomes.get(point)
+                if outcome is not None:
+                    self.outcomes.move_to_end(point)
+                    outcomes[i] = outcome
+                    self.hits += 1
+                elif point in claimed or point in waiting:
+                    continue
+                elif point in self.pending:
+                    waiting[point] = self.pending[point]
+                    self.coalesced += 1
+                else:
+                    claimed[point] = self.pending[point] = Future()
+                    self.misses += 1
+        return (outcomes, waiting, claimed)
+
+    def _finish(self, claimed, evaluated):
+        with self.lock:
+            for point, outcome in evaluated.items():
+                self.outcomes[point] = outcome
+                del self.pending[point]
+            while len(self.outcomes) > self.maxsize:
+                self.outcomes.popitem(last=False)
+        for point, outcome in evaluated.items():
+            claimed[point].set_result(outcome)
+
+    def get(self, points):
+        '''
+        Returns the outcomes of a list of points
+        '''
+        (outcomes, waiting, claimed) = self._claim(points)
+        if claimed:
+            todo = list(claimed)
+            try:
+                result = runSweep(todo, workers=self.workers, executor=self.executor)
+            except BaseException as e:
+                # e.g., a broken worker pool: let waiting requests fail as well
+                with self.lock:
+                    for point in todo:
+                        del self.pending[point]
+                for point in todo:
+                    claimed[point].set_exception(e)
+                raise
+            errors = {e.point: (e.error, e.traceback) for e in result.errors}
+            self._finish(claimed, {p: (m, errors.get(p)) for p, m in
+                                   zip(result.points, result.metrics)})
+        for i, point in enumerate(points):
+            if outcomes[i] is None:
+                future = claimed.get(point) or waiting[point]
+                outcomes[i] = future.result()
+        return outcomes
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.outcomes), "hits": self.hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def setup(self):
+        # headers and body are written separately, which would be delayed
+        # by Nagle's algorithm on TCP connections
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self):
+        # the client address of a Unix socket is not a (host, port) pair
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            raise QueryError("invalid JSON: " + str(e))
+
+    def _handle(self, route):
+        try:
+            self._send(200, route())
+        except QueryError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            # answer instead of dropping the connection
+            self.log_error("%s", traceback.format_exc())
+            self._send(500, {"error": type(e).__name__ + ": " + str(e)})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/schemes":
+            self._handle(lambda: {"schemes": list(SCHEMES), "metrics": list(METRICS)})
+        elif url.path == "/stats":
+            self._handle(self.server.cache.stats)
+        elif url.path == "/evaluate":
+            self._handle(lambda: self._evaluate(_queryFromURL(url.query)))
+        else:
+            self._send(404, {"error": "not found: " + url.path})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == "/evaluate":
+            self._handle(lambda: self._evaluate(self._body()))
+        elif url.path == "/batch":
+            self._handle(lambda: self._batch(self._body()))
+        else:
+            self._send(404, {"error": "not found: " + url.path})
+
+    def _evaluate(self, query):
+        point = parseQuery(query)
+        return answer(point, self.server.cache.get([point])[0])
+
+    def _batch(self, body):
+        if not isinstance(body, dict) or not isinstance(body.get("queries"), list):
+            raise QueryError("a batch must be an object with a list of queries")
+        points = [parseQuery(q) for q in body["queries"]]
+        outcomes = self.server.cache.get(points)
+        return {"results": [answer(p, o) for p, o in zip(points, outcomes)]}
+
+
+def _queryFromURL(querystring):
+    '''
+    Query of the URL parameters: scheme, datasize or mb, and
+    all others are keyword parameters (parsed as JSON if possible)
+    '''
+    query = {"params": {}}
+    for name, value in parse_qsl(querystring):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+        if name in ("scheme", "datasize", "mb"):
+            query[name] = value
+        else:
+            query["params"][name] = value
+    return query
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache, verbose=False):
+        self.cache = cache
+        self.verbose = verbose
+        super().__init__(address, RequestHandler)
+
+
+class UnixMetricsServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, cache, verbose=False):
+        self.cache = cache
+        self.verbose = verbose
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, RequestHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the metrics of the schemes over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind to")
+    parser.add_argument("--unix", help="bind to a Unix socket at this path instead")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of parallel workers for batches (default: 1, 0 for all cores)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="maximum number of cached points")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else defaultWorkers()
+    # one pool for the lifetime of the server, so that batches do not
+    # start processes and the workers keep their caches warm
+    executor = makeExecutor(workers) if workers > 1 else None
+    cache = MetricsCache(args.cache_size, workers, executor)
+
+    if args.unix:
+        server = UnixMetricsServer(args.unix, cache, args.verbose)
+        print("Serving on unix:" + args.unix)
+    else:
+        server = MetricsServer((args.host, args.port), cache, args.verbose)
+        print("Serving on http://{}:{}".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
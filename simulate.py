@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+'''
+Monte Carlo simulation of random sampling, to check how tight the
+analytic number of samples (Code.samples) is.
+
+A trial draws a number of uniformly random positions of the codeword
+(with replacement) and decides whether the data can be reconstructed
+from the symbols at these positions:
+- for codes that are not tensor codes (Reed-Solomon codes, interleaved
+  codes, the trivial code), iff at least reception distinct positions
+  are known,
+- for tensor codes, iff iterative row/column decoding recovers the
+  whole codeword, where a row (column) can be decoded once at least
+  reception of the row (column) code many of its symbols are known.
+
+Trials are simulated in batches as 2D arrays. For tensor codes, the
+availability grids of a batch are packed into 64-bit words, both row by
+row and column by column, so that the known symbols of every row and
+column can be counted with a popcount (requires NumPy >= 2.0).
+Every batch uses its own random stream, spawned from one seed, so the
+results only depend on the seed and not on the number of workers.
+
+Usage: python3 simulate.py <scheme> <data size in MB> [trials]
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+
+import sys
+import numpy as np
+
+from codes import *
+from schemes import *
+from fri import *
+
+# maximum number of array entries per batch of trials
+BATCH_ENTRIES = 2**23
+
+
+def _batches(trials, entries_per_trial):
+    '''
+    Split trials into batches of at most BATCH_ENTRIES array entries
+    '''
+    size = max(1, BATCH_ENTRIES // max(1, entries_per_trial))
+    return [min(size, trials - i) for i in range(0, trials, size)]
+
+
+def _thresholdFailures(codeword_len, reception, samples, trials, seed):
+    '''
+    Number of trials in which fewer than reception
+    distinct positions out of codeword_len are sampled
+    '''
+    if samples == 0:
+        return trials if reception > 0 else 0
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, codeword_len, size=(trials, samples))
+    positions.sort(axis=1)
+    distinct = 1 + np.count_nonzero(np.diff(positions, axis=1), axis=1)
+    return int(np.count_nonzero(distinct < reception))
+
+
+def _fullBits(length, words):
+    '''
+    Bitset of words 64-bit words with the first length bits set
+    '''
+    return _packBool(np.ones((1, length), dtype=bool), words)[0]
+
+
+def _packBool(mask, words):
+    '''
+    Pack a boolean array of shape (trials, length) into a bitset of
+    shape (trials, words), where bit i of the bitset is mask[:, i]
+    '''
+    packed = np.packbits(mask, axis=1, bitorder="little")
+    padded = np.zeros((mask.shape[0], 8 * words), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view("<u8").astype(np.uint64, copy=False)
+
+
+def _packPositions(positions, rows, cols, words):
+    '''
+    Bitset of shape (trials, rows, words), where bit c of row r is set
+    iff r * cols + c is one of the positions sampled in that trial
+    '''
+    trials = positions.shape[0]
+    (r, c) = np.divmod(positions, cols)
+    bit = ((np.arange(trials)[:, None] * rows + r) * (64 * words) + c).ravel()
+    # sorted, so that the bits of every word are consecutive (duplicates
+    # do not matter, as they are combined with or)
+    bit.sort()
+    word = bit >> 6
+    values = np.left_shift(np.uint64(1), (bit & 63).astype(np.uint64))
+    starts = np.flatnonzero(np.diff(word, prepend=-1))
+    bits = np.zeros(trials * rows * words, dtype=np.uint64)
+    bits[word[starts]] = np.bitwise_or.reduceat(values, starts)
+    return bits.reshape(trials, rows, words)
+
+
+def _popcount(bits):
+    '''
+    Number of set bits in every row of a bitset of shape (trials, rows, words)
+    '''
+    return np.bitwise_count(bits).sum(axis=2, dtype=np.int64)
+
+
+def peelBits(rowbits, colbits, row_reception, col_reception):
+    '''
+    Iterative row/column decoding on a batch of availability grids
+    given as bitsets: a row (column) with at least row_reception
+    (col_reception) known symbols is recovered completely, until no
+    row or column changes. rowbits has shape (trials, rows, words)
+    and holds every row of the grid, colbits has shape (trials, columns,
+    words) and holds every column. Both are updated in place. Returns
+    a boolean array indicating for every trial whether the whole grid
+    has been recovered.
+    '''
+    (rows, cols) = (rowbits.shape[1], colbits.shape[1])
+    fullrow = _fullBits(cols, rowbits.shape[2])
+    fullcol = _fullBits(rows, colbits.shape[2])
+    while True:
+        known = _popcount(rowbits)
+        newrows = (known >= row_reception) & (known < cols)
+        if newrows.any():
+            rowbits[newrows] = fullrow
+            colbits |= _packBool(newrows, colbits.shape[2])[:, None, :]
+        known = _popcount(colbits)
+        newcols = (known >= col_reception) & (known < rows)
+        if newcols.any():
+            colbits[newcols] = fullcol
+            rowbits |= _packBool(newcols, rowbits.shape[2])[:, None, :]
+        if not newrows.any() and not newcols.any():
+            return _popcount(rowbits).sum(axis=1) == rows * cols
+
+
+def _tensorFailures(row, col, samples, trials, seed):
+    '''
+    Number of trials in which iterative decoding of the
+    tensor code row.tensor(col) fails
+    '''
+    rng = np.random.default_rng(seed)
+    # one grid row per symbol of the column code, of the length of the row code
+    (rows, cols) = (col.codeword_len, row.codeword_len)
+    positions = rng.integers(0, rows * cols, size=(trials, samples))
+    (r, c) = np.divmod(positions, cols)
+    rowbits = _packPositions(positions, rows, cols, -(-cols // 64))
+    colbits = _packPositions(c * rows + r, cols, rows, -(-rows // 64))
+    recovered = peelBits(rowbits, colbits, row.reception, col.reception)
+    return int(np.count_nonzero(~recovered))
+
+
+def _failures(code, samples, trials, seed):
+    assert len(code.factors) in (0, 2), \
+        "only tensor codes with two dimensions can be simulated"
+    if len(code.factors) == 2:
+        (row, col) = code.factors
+        return _tensorFailures(row, col, samples, trials, seed)
+    return _thresholdFailures(code.codeword_len, code.reception, samples, trials, seed)
+
+
+def _entriesPerTrial(code, samples):
+    if len(code.factors) == 2:
+        # positions and both bitsets of the grid
+        return samples + code.codeword_len // 32
+    return samples
+
+
+def simulateFailures(code, samples, trials, seed=0, workers=1):
+    '''
+    Simulate trials random samplings of samples positions each.
+    Returns the number of trials in which reconstruction fails.
+    '''
+    batches = _batches(trials, _entriesPerTrial(code, samples))
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    args = [(code, samples, b, s) for b, s in zip(batches, seeds)]
+    if workers <= 1 or len(batches) <= 1:
+        return sum(_failures(*a) for a in args)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_failures, *zip(*args)))
+
+
+def failureRate(code, samples, trials, seed=0, workers=1):
+    '''
+    Empirical probability that reconstruction fails with the given number
+    of samples, estimated from the given number of trials.
+    '''
+    return simulateFailures(code, samples, trials, seed, workers) / trials
+
+
+def failureCurve(code, samplesrange, trials, seed=0, workers=1):
+    '''
+    Returns a list of (samples, failures) for every number of samples in
+    samplesrange. All numbers of samples use the same seed.
+    '''
+    return [(s, simulateFailures(code, s, trials, seed, workers))
+            for s in samplesrange]
+
+
+def empiricalSamples(code, trials, maxfailures=0, seed=0, workers=1):
+    '''
+    Smallest number of samples for which at most maxfailures out of
+    trials simulated samplings fail, found by binary search below
+    code.samples (or above, if code.samples is not enough).
+    '''
+    lo = code.reception - 1 if len(code.factors) == 0 else 0
+    hi = code.samples
+    while simulateFailures(code, hi, trials, seed, workers) > maxfailures:
+        (lo, hi) = (hi, 2 * hi)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if simulateFailures(code, mid, trials, seed, workers) > maxfailures:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def main():
+    from sweep import SCHEMES
+
+    if len(sys.argv) < 3 or sys.argv[1] not in SCHEMES:
+        print("Usage: python3 simulate.py <scheme> <data size in MB> [trials]")
+        print("Schemes: " + ", ".join(SCHEMES))
+        sys.exit(-1)
+    code = SCHEMES[sys.argv[1]](int(float(sys.argv[2]) * 8000000)).code
+    trials = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+
+    print("codeword length " + str(code.codeword_len) +
+          ", reception " + str(code.reception) +
+          ", analytic samples " + str(code.samples))
+    if len(code.factors) == 2:
+        (via_reception, via_rows, via_cols) = tensor_sample_bounds(*code.factors)
+        print("bounds: via reception " + str(via_reception) +
+              ", direct via rows " + str(via_rows) +
+              ", direct via columns " + str(via_cols))
+    empirical = empiricalSamples(code, trials)
+    print("empirical samples (no failure in " + str(trials) + " trials): " +
+          str(empirical))
+    print("samples    failures / trials    failure rate")
+    for fraction in [0.6, 0.7, 0.8, 0.9, 1.0]:
+        s = max(1, int(fraction * empirical))
+        failures = simulateFailures(code, s, trials)
+        print("{:<10} {:>8} / {:<10} {:.2e}".format(
+            s, failures, trials, failures / trials))
+
+
+if __name__ == "__main__":
+    main()
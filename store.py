@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+'''
+Persistent store for evaluated sweep points, based on SQLite.
+
+The METRICS of every point are stored together with the scheme name,
+the keyword parameters, the datasize and a version. The version is a
+hash of the sources of the modules that define the cost model, of
+the security constants, and of the machine profile, so that changing
+any of them invalidates all previously stored points.
+'''
+
+from array import array
+from dataclasses import asdict, is_dataclass
+from operator import attrgetter
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import codes
+import costs
+import schemes
+import fri
+import hashopt
+from sweep import *
+
+try:
+    # exact.py requires numpy, without which no exact results are computed
+    import exact
+except ImportError:
+    exact = None
+
+DEFAULT_STORE_PATH = os.environ.get("DAS_STORE", "./results.sqlite")
+
+# modules whose source determines the results
+VERSIONED_MODULES = [codes, costs, schemes, fri, hashopt] + \
+    ([exact] if exact is not None else [])
+
+# names of the constants (in the modules above) that determine the results
+VERSIONED_CONSTANTS = [
+    "SECPAR_SOUND",
+    "BLS_FE_SIZE", "BLS_GE_SIZE", "PEDERSEN_FE_SIZE", "PEDERSEN_GE_SIZE",
+    "HASH_SIZE",
+    "GRINDING", "RO_QUERIES", "STATISTICAL_SECURITY", "FRI_SOUNDNESS",
+    "FRI_FANIN_RANGE", "FRI_BASEDIMENSION_RANGE", "FRI_MAX_BATCHSIZE",
+    "DEFAULT_PROFILE",
+    "HASH_SOUNDNESS", "HASH_INVRATE_RANGE", "HASH_SHAPE_STEPS",
+    "BLOCK", "DROP_BITS",
+]
+
+
+def versionConstants():
+    '''
+    Returns the current values of all VERSIONED_CONSTANTS
+    '''
+    constants = {}
+    for name in VERSIONED_CONSTANTS:
+        for module in VERSIONED_MODULES:
+            if hasattr(module, name):
+                value = getattr(module, name)
+                constants[name] = asdict(value) if is_dataclass(value) else value
+    return constants
+
+
+def codeVersion():
+    '''
+    Hash of the sources of VERSIONED_MODULES, of versionConstants(),
+    and of the list of METRICS
+    '''
+    h = hashlib.sha256()
+    for module in VERSIONED_MODULES:
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+    h.update(json.dumps(versionConstants(), sort_keys=True).encode())
+    h.update(json.dumps(METRICS).encode())
+    return h.hexdigest()
+
+
+def _pack(values):
+    '''
+    Pack a list of numbers into (typecode, bytes), keeping ints as ints
+    '''
+    typecode = "q" if all(isinstance(v, int) for v in values) else "d"
+    return (typecode, array(typecode, values).tobytes())
+
+
+def _unpack(typecode, data):
+    return array(typecode, data).tolist()
+
+
+class ResultStore:
+    '''
+    Store of the METRICS of sweep points. Use lookup to get the stored
+    metrics of a list of points, and save to add newly evaluated points.
+
+    Points are stored in blocks of up to BLOCK_SIZE points of the same
+    scheme and parameters, with one packed array per metric, so that
+    large ranges of points can be loaded with few queries.
+    '''
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, path=DEFAULT_STORE_PATH, version=None):
+        self.path = path
+        self.version = codeVersion() if version is None else version
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            "version TEXT, scheme TEXT, params TEXT, "
+            "lo INTEGER, hi INTEGER, "    # smallest and largest datasize
+            "types TEXT, "                # typecode of every metric
+            "datasizes BLOB, metrics BLOB)")
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS blocks_key "
+            "ON blocks (version, scheme, params, lo)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, points):
+        '''
+        Returns a list with the stored metrics of every point
+        (None for points that are not in the store)
+        '''
+        found = [None] * len(points)
+        # (scheme, params) -> datasize -> position in points
+        keys = list(map(attrgetter("scheme", "params"), points))
+        datasizes = list(map(attrgetter("datasize"), points))
+        if len(set(keys)) == 1:
+            groups = {keys[0]: dict(zip(datasizes, range(len(points))))}
+        else:
+            groups = {}
+            for i, key in enumerate(keys):
+                groups.setdefault(key, {})[datasizes[i]] = i
+
+        for (scheme, params), wanted in groups.items():
+            # blocks are read in insertion order, so newer results win
+            blocks = self.db.execute(
+                "SELECT types, datasizes, metrics FROM blocks "
+                "WHERE version = ? AND scheme = ? AND params = ? "
+                "AND lo <= ? AND hi >= ? ORDER BY rowid",
+                (self.version, scheme, json.dumps(params),
+                 max(wanted), min(wanted)))
+            for (types, stored, metrics) in blocks:
+                count = len(stored) // 8
+                columns = []
+                offset = 0
+                for typecode in types:
+                    size = count * array(typecode).itemsize
+                    columns.append(_unpack(typecode, metrics[offset:offset + size]))
+                    offset += size
+                positions = map(wanted.get, _unpack("q", stored))
+                for i, row in zip(positions, zip(*columns)):
+                    if i is not None:
+                        found[i] = row
+        # duplicate points share the position of their last occurrence
+        if len(points) > sum(len(wanted) for wanted in groups.values()):
+            for i in range(len(points)):
+                if found[i] is None:
+                    found[i] = found[groups[keys[i]][datasizes[i]]]
+        return found
+
+    def save(self, pairs):
+        '''
+        Store the metrics of an iterable of (point, metrics) pairs
+        '''
+        groups = {}
+        for point, metrics in pairs:
+            groups.setdefault((point.scheme, point.params), {})[
+                point.datasize] = metrics
+
+        blocks = []
+        for (scheme, params), results in groups.items():
+            datasizes = sorted(results)
+            for i in range(0, len(datasizes), self.BLOCK_SIZE):
+                block = datasizes[i:i + self.BLOCK_SIZE]
+                types = ""
+                metrics = b""
+                for column in zip(*[results[d] for d in block]):
+                    (typecode, data) = _pack(column)
+                    types += typecode
+                    metrics += data
+                blocks.append((self.version, scheme, json.dumps(params),
+                               block[0], block[-1], types,
+                               _pack(block)[1], metrics))
+        self.db.executemany(
+            "INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", blocks)
+        self.db.commit()
+
+    def prune(self):
+        '''
+        Delete all points that belong to other versions
+        '''
+        self.db.execute("DELETE FROM blocks WHERE version != ?",
+                        (self.version,))
+        self.db.commit()
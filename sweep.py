@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+'''
+Sweep engine: evaluates many (scheme, datasize, parameters) points,
+optionally in parallel, and collects the metrics of every point.
+
+Schemes are referred to by name via the registry SCHEMES, so that points
+can be sent to worker processes. Results are returned in the order of
+the input points, and a point that fails (e.g., because an assertion in
+the parameter selection does not hold) is reported as an error instead
+of aborting the sweep.
+'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+
+import os
+import traceback
+
+from schemes import *
+from fri import *
+from hashopt import *
+from instrument import enableFromEnvironment
+
+# name -> factory taking the datasize (and keyword parameters)
+# and returning a Scheme. The names are the ones used for the csv files.
+SCHEMES = {
+    "naive": makeNaiveScheme,
+    "merkle": makeMerkleScheme,
+    "rs": makeKZGScheme,
+    "tensor": makeTensorScheme,
+    "hash": makeHashBasedScheme,
+    "homhash": makeHomHashBasedScheme,
+    "fri": makeFRIScheme,
+    "hashopt": optimizeHashBasedScheme,
+    "homhashopt": optimizeHomHashBasedScheme,
+}
+
+# metrics of a scheme that are recorded for every point, in this order
+METRICS = ("com_size", "comm_per_query", "total_comm", "encoding_size",
+           "reception", "samples", "encoding_length",
+           "prover_time", "verifier_time", "decoder_time",
+           "total_comm_multiproof")
+
+BACKENDS = ("process", "thread")
+
+# units of data sizes given as strings (see parseSizes), in bits
+SIZE_UNITS = {"KB": 8000, "MB": 8000000, "GB": 8000000000}
+
+# default number of points per chunk sent to a worker by streamSweep,
+# and per batch written to the sinks by runPipeline
+STREAM_CHUNKSIZE = 256
+STREAM_BATCHSIZE = 4096
+
+
+def registerScheme(name, makeScheme):
+    '''
+    Register a factory under a name. To be visible in worker processes,
+    this has to happen at import time or before the sweep is started.
+    '''
+    SCHEMES[name] = makeScheme
+
+
+def schemeMetrics(scheme):
+    '''
+    Returns the tuple of all METRICS of a scheme
+    '''
+    return (scheme.com_size, scheme.comm_per_query(), scheme.total_comm(),
+            scheme.encoding_size(), scheme.reception(), scheme.samples(),
+            scheme.encoding_length(), scheme.prover_time(),
+            scheme.verifier_time(), scheme.decoder_time(),
+            scheme.total_comm_multiproof())
+
+
+@dataclass(frozen=True)
+class SweepPoint:
+    scheme: str        # name of the scheme in SCHEMES
+    datasize: int      # size of the data in bits
+    params: tuple = ()  # keyword parameters as sorted (name, value) pairs
+
+    def kwargs(self):
+        return dict(self.params)
+
+    def make(self):
+        '''
+        Instantiate the scheme. The parameter exact=True is not passed to
+        the scheme, but selects its variant with the exact number of
+        samples (Scheme.with_exact_samples).
+        '''
+        params = self.kwargs()
+        exact = params.pop("exact", False)
+        scheme = SCHEMES[self.scheme](self.datasize, **params)
+        return scheme.with_exact_samples() if exact else scheme
+
+
+def makePoint(scheme, datasize, **params):
+    return SweepPoint(scheme, datasize, tuple(sorted(params.items())))
+
+
+@dataclass
+class SweepError:
+    point: SweepPoint
+    error: str      # type and message of the exception
+    traceback: str
+
+
+@dataclass
+class SweepResult:
+    points: list    # the input points
+    metrics: list   # tuple of METRICS per point, None if the point failed
+    errors: list    # SweepError per failed point, in input order
+
+    def __iter__(self):
+        '''
+        Iterate over (point, metrics) of all successful points
+        '''
+        for point, metrics in zip(self.points, self.metrics):
+            if metrics is not None:
+                yield (point, metrics)
+
+
+def evaluatePoint(point):
+    '''
+    Evaluate one point. Returns (metrics, None) on success
+    and (None, (error, traceback)) if an exception is raised.
+    '''
+    try:
+        return (schemeMetrics(point.make()), None)
+    except Exception as e:
+        return (None, (type(e).__name__ + ": " + str(e), traceback.format_exc()))
+
+
+def _evaluateChunk(points):
+    return [evaluatePoint(point) for point in points]
+
+
+def defaultWorkers():
+    return os.cpu_count() or 1
+
+
+def makeExecutor(workers, backend="process"):
+    '''
+    Pool of workers for the given backend, e.g., to be kept
+    across many calls of runSweep (see runSweep)
+    '''
+    assert backend in BACKENDS, "unknown backend " + str(backend)
+    if backend == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def mapChunks(function, items, workers=1, backend="process", chunksize=None,
+              executor=None):
+    '''
+    Apply function, which maps a list of items to a list of results, to
+    the items in chunks of chunksize items (default: such that every
+    worker gets about 4 chunks), and return the list of all results.
+    With workers > 1, the chunks are sent to a pool of workers as in
+    runSweep, so function has to be picklable for backend="process".
+    '''
+    assert backend in BACKENDS, "unknown backend " + str(backend)
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return function(items)
+    if chunksize is None:
+        chunksize = max(1, len(items) // (4 * workers))
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    if executor is not None:
+        return [result for chunk in executor.map(function, chunks) for result in chunk]
+    with makeExecutor(workers, backend) as pool:
+        return [result for chunk in pool.map(function, chunks) for result in chunk]
+
+
+def runSweep(points, workers=1, backend="process", chunksize=None, store=None,
+             executor=None):
+    '''
+    Evaluate all points and return a SweepResult.
+    With workers > 1, the points are evaluated by a pool of workers, either
+    processes (backend="process") or threads (backend="thread", which only
+    runs in parallel on a free-threaded Python build).
+    The points are sent to the workers in chunks of chunksize points
+    (default: such that every worker gets about 4 chunks).
+    If a ResultStore is given, only points that are not in the store
+    are evaluated, and the newly evaluated points are added to it.
+    If an executor (e.g., of makeExecutor) is given, it is used as the
+    pool instead of a new one, so that its workers and their caches are
+    kept across sweeps; it is not shut down.
+    '''
+    assert backend in BACKENDS, "unknown backend " + str(backend)
+    points = list(points)
+
+    cached = store.lookup(points) if store is not None else [None] * len(points)
+    todo = list(dict.fromkeys(p for p, m in zip(points, cached) if m is None))
+
+    outcomes = mapChunks(_evaluateChunk, todo, workers, backend, chunksize, executor)
+
+    evaluated = dict(zip(todo, outcomes))
+    if store is not None:
+        store.save((p, m) for p, (m, error) in evaluated.items() if error is None)
+
+    metrics = []
+    errors = []
+    for point, m in zip(points, cached):
+        if m is not None:
+            metrics.append(m)
+            continue
+        (m, error) = evaluated[point]
+        metrics.append(m)
+        if error is not None:
+            errors.append(SweepError(point, error[0], error[1]))
+    return SweepResult(points=points, metrics=metrics, errors=errors)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _finishChunk(chunk, cached, todo, outcomes, store):
+    if not isinstance(outcomes, list):
+        outcomes = outcomes.result()
+    evaluated = dict(zip(todo, outcomes))
+    if store is not None:
+        store.save((p, m) for p, (m, error) in evaluated.items() if error is None)
+    for point, m in zip(chunk, cached):
+        if m is not None:
+            yield (point, m, None)
+            continue
+        (m, error) = evaluated[point]
+        yield (point, m, None if error is None else SweepError(point, error[0], error[1]))
+
+
+def streamSweep(points, workers=1, backend="process", chunksize=STREAM_CHUNKSIZE,
+                maxpending=None, store=None):
+    '''
+    Evaluate the points of an iterable (e.g., a generator) lazily and yield
+    (point, metrics, error) for every point in input order, where metrics
+    is None and error a SweepError if the point failed.
+    The points are taken from the iterable in chunks of chunksize points.
+    With workers > 1, at most maxpending chunks (default: 2 * workers) are
+    evaluated or waiting to be consumed at any time, so the memory does not
+    grow with the number of points if the consumer is slower than the workers.
+    If a ResultStore is given, it is used as in runSweep, per chunk.
+    '''
+    assert backend in BACKENDS, "unknown backend " + str(backend)
+    assert chunksize >= 1, "the chunk size must be positive"
+    executor = None
+    if workers > 1:
+        executor = makeExecutor(workers, backend)
+    limit = (maxpending or 2 * workers) if executor is not None else 1
+    pending = deque()
+    try:
+        for chunk in _chunked(points, chunksize):
+            cached = store.lookup(chunk) if store is not None else [None] * len(chunk)
+            todo = list(dict.fromkeys(p for p, m in zip(chunk, cached) if m is None))
+            if executor is None:
+                outcomes = _evaluateChunk(todo)
+            else:
+                outcomes = executor.submit(_evaluateChunk, todo)
+            pending.append((chunk, cached, todo, outcomes))
+            while len(pending) >= limit:
+                yield from _finishChunk(*pending.popleft(), store)
+        while pending:
+            yield from _finishChunk(*pending.popleft(), store)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def runPipeline(points, sinks, batchsize=STREAM_BATCHSIZE, **kwargs):
+    '''
+    Evaluate the points of an iterable with streamSweep(points, **kwargs)
+    and write the successful (point, metrics) pairs to every sink in
+    batches of up to batchsize pairs. A sink is an object with methods
+    write(pairs) and close(), which is called at the end.
+    Returns the list of SweepErrors of the failed points.
+    '''
+    errors = []
+    batch = []
+    try:
+        for (point, metrics, error) in streamSweep(points, **kwargs):
+            if error is not None:
+                errors.append(error)
+                continue
+            batch.append((point, metrics))
+            if len(batch) >= batchsize:
+                for sink in sinks:
+                    sink.write(batch)
+                batch = []
+        if batch:
+            for sink in sinks:
+                sink.write(batch)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return errors
+
+
+def parseSize(arg, unit="MB"):
+    '''
+    Data size in bits of a number with an optional unit (default: MB),
+    e.g., 32, 0.5, 512KB, or 2GB
+    '''
+    arg = arg.strip()
+    if arg[-2:].upper() in SIZE_UNITS:
+        (arg, unit) = (arg[:-2], arg[-2:].upper())
+    return int(float(arg) * SIZE_UNITS[unit])
+
+
+def parseSizes(arg):
+    '''
+    Generator of the data sizes in bits of a comma-separated list of sizes
+    and ranges start:stop[:step] (including stop), e.g., 1,2,4 or 1:155 or
+    1GB:4GB:0.5GB. The unit of stop and step defaults to the one of start.
+    '''
+    for part in arg.split(","):
+        bounds = part.split(":")
+        if len(bounds) == 1:
+            yield parseSize(part)
+            continue
+        assert len(bounds) <= 3, "a range is start:stop[:step]"
+        unit = bounds[0].strip()[-2:].upper()
+        unit = unit if unit in SIZE_UNITS else "MB"
+        start = parseSize(bounds[0], unit)
+        stop = parseSize(bounds[1], unit)
+        step = parseSize(bounds[2], unit) if len(bounds) == 3 else SIZE_UNITS[unit]
+        assert step > 0, "the step of a range must be positive"
+        yield from range(start, stop + 1, step)
+
+
+def printErrors(result, file=None):
+    '''
+    Print a short report of the failed points
+    '''
+    for e in result.errors:
+        print("{} datasize={} params={}: {}".format(
+            e.point.scheme, e.point.datasize, e.point.kwargs(), e.error), file=file)
+
+
+# opt-in instrumentation of the whole run (see instrument.py)
+enableFromEnvironment()
@@ -1,27 +1,63 @@
 #!/usr/bin/env python
 
+import csv
+import json
 import math
 import sys
 from tabulate import tabulate
 
 from schemes import *
 from fri import *
-
-
-def makeRow(name, scheme, tex):
-    comsize = '{:.2f}'.format(round(scheme.com_size/8000.0, 2))
+from sweep import *
+
+# rows of the table: (name, name of the scheme in SCHEMES)
+ROWS = [
+    ("Naive", "naive"),
+    ("Merkle", "merkle"),
+    ("RS", "rs"),
+    ("Tensor", "tensor"),
+    ("Hash", "hash"),
+    ("HomHash", "homhash"),
+    ("FRI", "fri"),
+]
+
+
+def makeRow(name, metrics, tex, exact=None, times=False, multiproof=False,
+            availability=None):
+    '''
+    exact is (samples, total_comm) with the exact number of samples,
+    or None to leave out these columns.
+    times determines whether to add the prover, verifier, and decoder time.
+    multiproof determines whether to add the total communication with multiproofs.
+    availability is the time to availability in seconds (see latency.py),
+    or None to leave out this column.
+    '''
+    (com_size, comm_per_query, total_comm, encoding_size,
+     reception, samples, encodinglength,
+     prover_time, verifier_time, decoder_time,
+     total_comm_multiproof) = metrics
+    comsize = '{:.2f}'.format(round(com_size/8000.0, 2))
     encodingsize = '{:.2f}'.format(
-        round(scheme.encoding_size() / 8000000.0, 2))
-    commpqsize = '{:.2f}'.format(round(scheme.comm_per_query() / 8000.0, 2))
-    reception = scheme.reception()
-    encodinglength = scheme.encoding_length()
-    samples = scheme.samples()
-    commsize = '{:.2f}'.format(round(scheme.total_comm() / 8000000.0, 2))
+        round(encoding_size / 8000000.0, 2))
+    commpqsize = '{:.2f}'.format(round(comm_per_query / 8000.0, 2))
+    commsize = '{:.2f}'.format(round(total_comm / 8000000.0, 2))
     if tex:
-        row = ["\Inst"+name, comsize, encodingsize, commpqsize, commsize]
+        row = ["\\Inst"+name, comsize, encodingsize, commpqsize, commsize]
     else:
         row = [name, comsize, encodingsize, commpqsize,
                (reception, encodinglength), samples, commsize]
+    if exact is not None:
+        (exactsamples, exactcomm) = exact
+        exactcommsize = '{:.2f}'.format(round(exactcomm / 8000000.0, 2))
+        row += [exactcommsize] if tex else [exactsamples, exactcommsize]
+    if multiproof:
+        row += ['{:.2f}'.format(round(total_comm_multiproof / 8000000.0, 2))]
+    if times:
+        row += ['{:.2f}'.format(round(prover_time, 2)),
+                '{:.3f}'.format(round(verifier_time * 1000.0, 3)),
+                '{:.2f}'.format(round(decoder_time, 2))]
+    if availability is not None:
+        row += ['{:.2f}'.format(round(availability, 2))]
     return row
 
 #####################################################################
@@ -32,46 +68,120 @@ args = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
 
 if len(args) == 0:
     print("Missing Argument: Datasize in Megabytes.")
+    print("Hint: Datasizes can be lists and ranges with units, e.g., 1,2,4 or 1:155 or 512KB:2GB:512KB.")
     print("Hint: To print the table in LaTeX code, add the option -l.")
+    print("Hint: To reuse and save results in a local store, add the option -s.")
+    print("Hint: To add columns with the exact number of samples, add the option -e "
+          "(slow for large data sizes, e.g., 20 to 40 seconds per scheme at 32 MB).")
+    print("Hint: To add columns with the estimated computation times, add the option -c.")
+    print("Hint: To add a column with the total communication using Merkle multiproofs, add the option -m.")
+    print("Hint: To add a column with the time to availability of a light client, add the option -t.")
+    print("Hint: To print JSON Lines or CSV instead of a table, add the option --jsonl or --csv.")
+    print("Hint: To evaluate in parallel with N workers, add the option -jN.")
     sys.exit(-1)
 
-datasize = int(args[0])*8000000
+datasizes = [d for arg in args for d in parseSizes(arg)]
 
 
 # Print to LaTeX
 tex = "-l" in opts
 
-if tex:
-    table = [["Name", "|com|", "|Encoding|", "Comm. p. Q.", "Comm Total"]]
-else:
-    table = [["Name", "|com| [KB]", "|Encoding| [MB]",
-              "Comm. p. Q. [KB]", "Reception", "Samples", "Comm Total [MB]"]]
-
-
-scheme = makeNaiveScheme(datasize)
-table.append(makeRow("Naive", scheme, tex))
+# Add columns with the exact number of samples
+exact = "-e" in opts
 
-scheme = makeMerkleScheme(datasize)
-table.append(makeRow("Merkle", scheme, tex))
+# Add a column with the total communication using Merkle multiproofs
+multiproof = "-m" in opts
 
-scheme = makeKZGScheme(datasize)
-table.append(makeRow("RS", scheme, tex))
+# Add columns with the prover, verifier, and decoder time
+timecolumns = "-c" in opts
 
-scheme = makeTensorScheme(datasize)
-table.append(makeRow("Tensor", scheme, tex))
+# Add a column with the time until a client has completed its samples
+availability = "-t" in opts
+if availability:
+    from latency import timeToAvailability
 
-scheme = makeHashBasedScheme(datasize)
-table.append(makeRow("Hash", scheme, tex))
+# Print one JSON object or CSV row per data size and scheme
+jsonl = "--jsonl" in opts
+csvout = "--csv" in opts
 
-scheme = makeHomHashBasedScheme(datasize)
-table.append(makeRow("HomHash", scheme, tex))
-
-scheme = makeFRIScheme(datasize)
-table.append(makeRow("FRI", scheme, tex))
+# Number of parallel workers
+workers = 1
+for opt in opts:
+    if opt.startswith("-j"):
+        workers = int(opt[2:]) if opt[2:] else defaultWorkers()
 
+# Use the results store
+store = None
+if "-s" in opts:
+    from store import *
+    store = ResultStore()
 
 if tex:
-    print(tabulate(table, headers='firstrow',
-          tablefmt='latex_raw', disable_numparse=True))
+    header = ["Name", "|com|", "|Encoding|", "Comm. p. Q.", "Comm Total"]
 else:
-    print(tabulate(table, headers='firstrow', tablefmt='fancy_grid'))
+    header = ["Name", "|com| [KB]", "|Encoding| [MB]",
+              "Comm. p. Q. [KB]", "Reception", "Samples", "Comm Total [MB]"]
+if exact:
+    header += ["Comm Total (exact)"] if tex else \
+        ["Samples (exact)", "Comm Total (exact) [MB]"]
+if multiproof:
+    header += ["Comm Total (multiproof)"] if tex else \
+        ["Comm Total (multiproof) [MB]"]
+if timecolumns:
+    header += ["Prover", "Verifier p. Q.", "Decoder"] if tex else \
+        ["Prover [s]", "Verifier p. Q. [ms]", "Decoder [s]"]
+if availability:
+    header += ["Time to Avail."] if tex else ["Time to Avail. [s]"]
+
+
+# the points with the exact number of samples (if any) follow the others,
+# so that they are evaluated in parallel and stored as well
+points = [makePoint(scheme, datasize) for datasize in datasizes for (_, scheme) in ROWS]
+if exact:
+    points += [makePoint(scheme, datasize, exact=True)
+               for datasize in datasizes for (_, scheme) in ROWS]
+result = runSweep(points, workers=workers, store=store)
+exactmetrics = result.metrics[len(datasizes) * len(ROWS):]
+if result.errors:
+    printErrors(result, file=sys.stderr)
+    sys.exit(-1)
+
+if csvout:
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(["name", "scheme", "datasize"] + list(METRICS) +
+                    (["samples_exact", "total_comm_exact"] if exact else []) +
+                    (["time_to_availability"] if availability else []))
+
+for i, datasize in enumerate(datasizes):
+    table = [header]
+    for j, ((name, scheme), metrics) in enumerate(zip(ROWS, result.metrics[i * len(ROWS):])):
+        exactcolumns = None
+        if exact:
+            m = exactmetrics[i * len(ROWS) + j]
+            exactcolumns = (m[METRICS.index("samples")], m[METRICS.index("total_comm")])
+        availabilitytime = timeToAvailability(metrics) if availability else None
+        if jsonl:
+            row = {"name": name, "scheme": scheme, "datasize": datasize}
+            row.update(zip(METRICS, metrics))
+            if exact:
+                row.update(zip(["samples_exact", "total_comm_exact"], exactcolumns))
+            if availability:
+                row["time_to_availability"] = availabilitytime
+            print(json.dumps(row))
+        elif csvout:
+            writer.writerow([name, scheme, datasize] + list(metrics) +
+                            (list(exactcolumns) if exact else []) +
+                            ([availabilitytime] if availability else []))
+        else:
+            table.append(makeRow(name, metrics, tex, exactcolumns, timecolumns, multiproof,
+                                 availabilitytime))
+
+    if jsonl or csvout:
+        continue
+    if len(datasizes) > 1:
+        print("Data size: {:g} MB".format(datasize / 8000000))
+    if tex:
+        print(tabulate(table, headers='firstrow',
+              tablefmt='latex_raw', disable_numparse=True))
+    else:
+        print(tabulate(table, headers='firstrow', tablefmt='fancy_grid'))
@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+'''
+Vectorized counterparts of the code and scheme factories.
+
+Every make*SchemeArray function takes a NumPy array of data sizes (in bits)
+and returns a SchemeArray, i.e., a struct-of-arrays version of Scheme whose
+fields and methods are arrays with one entry per data size.
+
+The results are bit-identical to the scalar path. Whenever the scalar path
+rounds a floating point value with math.ceil, we compute the value with NumPy
+and recompute the (rare) entries that are within rounding distance of an
+integer with the scalar function, as NumPy and libm may differ in the last
+bit of log and log2. Floating point values that are returned without rounding
+(e.g., log2 of the codeword length in comm_per_query) are computed with the
+scalar math functions once per distinct value.
+'''
+
+from dataclasses import dataclass
+
+import math
+import numpy as np
+
+from codes import *
+from schemes import *
+from fri import *
+
+# relative distance to the next integer below which we do not trust
+# the NumPy result of a value that is rounded up afterwards
+_CEIL_TOLERANCE = 1e-11
+
+
+def _fixCeil(values, scalar, *args):
+    '''
+    Round up the array values, recomputing entries that are close to an
+    integer with the scalar function scalar. The i-th entry is recomputed as
+    scalar(*[a[i] for a in args]), where args are arrays of the same shape.
+    '''
+    result = np.ceil(values)
+    with np.errstate(invalid='ignore'):
+        close = np.abs(values - np.rint(values)) <= \
+            _CEIL_TOLERANCE * np.maximum(1.0, np.abs(values))
+    for i in np.flatnonzero(close):
+        result[i] = scalar(*[a[i].item() for a in args])
+    return result
+
+
+def _uniqueApply(fn, *columns):
+    '''
+    Evaluate the scalar function fn once for every distinct tuple of
+    entries of the given arrays and broadcast the results back.
+    '''
+    columns = [np.asarray(c) for c in columns]
+    keys = np.stack([c.astype(np.float64) for c in columns], axis=1)
+    _, first, inverse = np.unique(
+        keys, axis=0, return_index=True, return_inverse=True)
+    values = np.array([fn(*args)
+                       for args in zip(*[c[first].tolist() for c in columns])])
+    return values[inverse.reshape(-1)]
+
+
+def _ceilDiv(a, b):
+    '''
+    Same as math.ceil(a / b), elementwise and as int64.
+    '''
+    return np.ceil(np.asarray(a) / b).astype(np.int64)
+
+
+def samples_from_reception_array(sec_par, reception, codeword_len):
+    '''
+    Vectorized version of samples_from_reception.
+    reception and codeword_len are arrays of the same shape.
+    '''
+    reception = np.asarray(reception, dtype=np.int64)
+    codeword_len = np.asarray(codeword_len, dtype=np.int64)
+    samples = np.ones(reception.shape, dtype=np.int64)
+
+    def scalar(t, n):
+        return samples_from_reception(sec_par, t, n)
+
+    # special case: if all symbols are needed: just regular coupon collector
+    full = (reception == codeword_len) & (reception != 1)
+    if np.any(full):
+        n = codeword_len[full]
+        nf = n.astype(np.float64)
+        s = (nf / (np.log(math.e) / np.log(2.0))) * \
+            (np.log(nf) / np.log(2.0) + sec_par)
+        samples[full] = _fixCeil(s, scalar, reception[full], n)
+
+    # generalized coupon collector
+    general = (reception != codeword_len) & (reception != 1)
+    if np.any(general):
+        t = reception[general]
+        n = codeword_len[general]
+        delta = (t - 1).astype(np.float64)
+        c = delta / n
+        s = -sec_par / np.log2(c) + (1.0 - np.log(math.e) / np.log(c)) * delta
+        samples[general] = _fixCeil(s, scalar, t, n)
+
+    return samples
+
+
+def tensor_sample_bounds_array(row_len, row_reception, col_len, col_reception):
+    '''
+    Vectorized version of tensor_sample_bounds, where the row and column
+    codes are given by their codeword lengths and receptions.
+    '''
+    row_len = np.asarray(row_len, dtype=np.int64)
+    row_reception = np.asarray(row_reception, dtype=np.int64)
+    col_len = np.asarray(col_len, dtype=np.int64)
+    col_reception = np.asarray(col_reception, dtype=np.int64)
+
+    # the scalar path fails with a math domain error in this case
+    if np.any(row_reception <= 1) or np.any(col_reception <= 1):
+        raise ValueError('math domain error')
+
+    row_dist = row_len - row_reception + 1
+    col_dist = col_len - col_reception + 1
+    codeword_len = row_len * col_len
+    reception = codeword_len - row_dist * col_dist + 1
+
+    samples_via_reception = samples_from_reception_array(
+        SECPAR_SOUND, reception, codeword_len)
+
+    loge = math.log2(math.e)
+    lognc = np.log2(col_len)
+    lognr = np.log2(row_len)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logbinomr = (row_reception - 1) * \
+            (lognr + loge - np.log2(row_reception - 1))
+        loginnerr = np.log2(1.0 - row_dist / codeword_len)
+        logbinomc = (col_reception - 1) * \
+            (lognc + loge - np.log2(col_reception - 1))
+        loginnerc = np.log2(1.0 - col_dist / codeword_len)
+
+    def scalar(nr, tr, nc, tc):
+        return tensor_sample_bounds(
+            Code(0, 0, 0, nr, tr, 0), Code(0, 0, 0, nc, tc, 0))
+
+    samples_direct_via_rows = _fixCeil(
+        -(lognc + logbinomr + SECPAR_SOUND) / loginnerr,
+        lambda *a: scalar(*a)[1],
+        row_len, row_reception, col_len, col_reception).astype(np.int64)
+    samples_direct_via_cols = _fixCeil(
+        -(lognr + logbinomc + SECPAR_SOUND) / loginnerc,
+        lambda *a: scalar(*a)[2],
+        row_len, row_reception, col_len, col_reception).astype(np.int64)
+
+    return (samples_via_reception, samples_direct_via_rows,
+            samples_direct_via_cols)
+
+
+@dataclass
+class CodeArray:
+    '''
+    Struct-of-arrays version of Code. Every field is an array
+    with one entry per code.
+    '''
+    size_msg_symbol: np.ndarray
+    size_code_symbol: np.ndarray
+    msg_len: np.ndarray
+    codeword_len: np.ndarray
+    reception: np.ndarray
+    samples: np.ndarray
+
+    def __len__(self):
+        return len(self.codeword_len)
+
+    def __getitem__(self, i):
+        return Code(
+            size_msg_symbol=self.size_msg_symbol[i].item(),
+            size_code_symbol=self.size_code_symbol[i].item(),
+            msg_len=self.msg_len[i].item(),
+            codeword_len=self.codeword_len[i].item(),
+            reception=self.reception[i].item(),
+            samples=self.samples[i].item()
+        )
+
+    def interleave(self, ell):
+        return CodeArray(
+            size_msg_symbol=self.size_msg_symbol * ell,
+            size_code_symbol=self.size_code_symbol * ell,
+            msg_len=self.msg_len,
+            codeword_len=self.codeword_len,
+            reception=self.reception,
+            samples=self.samples
+        )
+
+    def tensor(self, col):
+        assert np.all(self.size_msg_symbol == col.size_msg_symbol)
+        assert np.all(self.size_code_symbol == col.size_code_symbol)
+        assert np.all(self.size_msg_symbol == self.size_code_symbol)
+
+        row_dist = self.codeword_len - self.reception + 1
+        col_dist = col.codeword_len - col.reception + 1
+        codeword_len = self.codeword_len * col.codeword_len
+        reception = codeword_len - row_dist * col_dist + 1
+
+        (samples_via_reception, samples_direct_via_rows,
+         samples_direct_via_cols) = tensor_sample_bounds_array(
+            self.codeword_len, self.reception, col.codeword_len, col.reception)
+
+        samples_direct = np.minimum(
+            samples_direct_via_rows, samples_direct_via_cols)
+        samples = np.minimum(samples_direct, samples_via_reception)
+
+        return CodeArray(
+            size_msg_symbol=self.size_msg_symbol,
+            msg_len=self.msg_len * col.msg_len,
+            size_code_symbol=self.size_code_symbol,
+            codeword_len=codeword_len,
+            reception=reception,
+            samples=samples
+        )
+
+
+def makeTrivialCodeArray(symbolsize, msg_len):
+    '''
+    Vectorized version of makeTrivialCode
+    '''
+    msg_len = np.asarray(msg_len, dtype=np.int64)
+    symbolsize = np.broadcast_to(symbolsize, msg_len.shape)
+    return CodeArray(
+        size_msg_symbol=symbolsize,
+        msg_len=msg_len,
+        size_code_symbol=symbolsize,
+        codeword_len=msg_len,
+        reception=msg_len,
+        samples=samples_from_reception_array(SECPAR_SOUND, msg_len, msg_len)
+    )
+
+
+def makeRSCodeArray(fsize, k, n):
+    '''
+    Vectorized version of makeRSCode
+    '''
+    k = np.asarray(k, dtype=np.int64)
+    n = np.asarray(n, dtype=np.int64)
+    assert np.all(k <= n)
+    assert np.all(2**fsize >= n), 'no such reed-solomon code :('
+    fsize = np.broadcast_to(fsize, k.shape)
+    return CodeArray(
+        size_msg_symbol=fsize,
+        msg_len=k,
+        size_code_symbol=fsize,
+        codeword_len=n,
+        reception=k,
+        samples=samples_from_reception_array(SECPAR_SOUND, k, n)
+    )
+
+
+@dataclass
+class SchemeArray:
+    '''
+    Struct-of-arrays version of Scheme. Every field is an array
+    with one entry per scheme, and so is the result of every method.
+    '''
+    code: CodeArray
+    com_size: np.ndarray
+    opening_overhead: np.ndarray
+
+    def __len__(self):
+        return len(self.code)
+
+    def __getitem__(self, i):
+        return Scheme(
+            code=self.code[i],
+            com_size=self.com_size[i].item(),
+            opening_overhead=self.opening_overhead[i].item()
+        )
+
+    def samples(self):
+        return self.code.samples
+
+    def total_comm(self):
+        return self.comm_per_query() * self.samples()
+
+    def comm_per_query(self):
+        # log2 is computed with math.log2 to match the scalar path
+        log_codeword_len = _uniqueApply(math.log2, self.code.codeword_len)
+        return log_codeword_len + self.opening_overhead + self.code.size_code_symbol
+
+    def encoding_size(self):
+        return self.code.codeword_len * (self.opening_overhead + self.code.size_code_symbol)
+
+    def reception(self):
+        return self.code.reception
+
+    def encoding_length(self):
+        return self.code.codeword_len
+
+
+def _datasizes(datasizes):
+    datasizes = np.asarray(datasizes, dtype=np.int64)
+    assert datasizes.ndim == 1
+    # the scalar path converts datasizes to floats, which is exact below 2^53
+    assert np.all(datasizes < 2**53)
+    return datasizes
+
+
+def makeNaiveSchemeArray(datasizes):
+    '''
+    Vectorized version of makeNaiveScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    ones = np.ones(datasizes.shape, dtype=np.int64)
+    return SchemeArray(
+        code=CodeArray(
+            size_msg_symbol=datasizes,
+            msg_len=ones,
+            size_code_symbol=datasizes,
+            codeword_len=ones,
+            reception=ones,
+            samples=ones
+        ),
+        com_size=np.full(datasizes.shape, HASH_SIZE),
+        opening_overhead=np.zeros(datasizes.shape, dtype=np.int64)
+    )
+
+
+def makeMerkleSchemeArray(datasizes, chunksize=1024):
+    '''
+    Vectorized version of makeMerkleScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    k = _ceilDiv(datasizes, chunksize)
+    depth = _fixCeil(np.log(k) / np.log(2.0),
+                     lambda x: math.ceil(math.log(x, 2)), k)
+    return SchemeArray(
+        code=makeTrivialCodeArray(chunksize, k),
+        com_size=np.full(datasizes.shape, HASH_SIZE),
+        opening_overhead=depth.astype(np.int64) * HASH_SIZE
+    )
+
+
+def makeKZGSchemeArray(datasizes, invrate=4):
+    '''
+    Vectorized version of makeKZGScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    k = _ceilDiv(datasizes, BLS_FE_SIZE)
+    return SchemeArray(
+        code=makeRSCodeArray(
+            BLS_FE_SIZE,
+            k,
+            k * invrate
+        ),
+        com_size=np.full(datasizes.shape, BLS_GE_SIZE),
+        opening_overhead=np.full(datasizes.shape, BLS_GE_SIZE),
+    )
+
+
+def _squareDimension(datasizes, fsize):
+    m = _ceilDiv(datasizes, fsize)
+    return np.ceil(np.sqrt(m)).astype(np.int64)
+
+
+def makeTensorSchemeArray(datasizes, invrate=2):
+    '''
+    Vectorized version of makeTensorScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    k = _squareDimension(datasizes, BLS_FE_SIZE)
+    n = invrate * k
+
+    rs = makeRSCodeArray(BLS_FE_SIZE, k, n)
+
+    return SchemeArray(
+        code=rs.tensor(rs),
+        com_size=BLS_GE_SIZE * k,
+        opening_overhead=np.full(datasizes.shape, BLS_GE_SIZE),
+    )
+
+
+def makeHashBasedSchemeArray(datasizes, fsize=32, P=8, L=64, invrate=4):
+    '''
+    Vectorized version of makeHashBasedScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    k = _squareDimension(datasizes, fsize)
+    n = invrate * k
+    rs = makeRSCodeArray(fsize, k, n)
+
+    return SchemeArray(
+        code=rs.interleave(k),
+        com_size=n * HASH_SIZE + P * n * fsize + L * k * fsize,
+        opening_overhead=np.zeros(datasizes.shape, dtype=np.int64),
+    )
+
+
+def makeHomHashBasedSchemeArray(datasizes, P=2, L=2, invrate=4):
+    '''
+    Vectorized version of makeHomHashBasedScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    k = _squareDimension(datasizes, PEDERSEN_FE_SIZE)
+    n = invrate * k
+    rs = makeRSCodeArray(PEDERSEN_FE_SIZE, k, n)
+
+    return SchemeArray(
+        code=rs.interleave(k),
+        com_size=n * PEDERSEN_GE_SIZE + P * n *
+        PEDERSEN_FE_SIZE + L * k * PEDERSEN_FE_SIZE,
+        opening_overhead=np.zeros(datasizes.shape, dtype=np.int64),
+    )
+
+
+def _friDimensions(fanin, basedimension, maxmink):
+    '''
+    Return the dimensions basedimension * fanin^r for r = 0, 1, ...
+    up to the first one that is at least maxmink
+    '''
+    dimensions = [basedimension]
+    while dimensions[-1] < maxmink:
+        dimensions.append(dimensions[-1] * fanin)
+    return np.array(dimensions, dtype=np.int64)
+
+
+def friNumRoundsArray(mink, fanin, basedimension):
+    '''
+    Vectorized version of friNumRounds.
+    The number of rounds is the number of dimensions
+    basedimension * fanin^r that are smaller than mink
+    '''
+    mink = np.asarray(mink, dtype=np.int64)
+    dimensions = _friDimensions(fanin, basedimension, mink.max(initial=1))
+    return np.searchsorted(dimensions, mink, side='left')
+
+
+def friGoodBatchsizeArray(minfe, fsize, invrate, basedimension, fanin,
+                          maxbatchsize=FRI_MAX_BATCHSIZE):
+    '''
+    Vectorized version of friGoodBatchsize, evaluating the same candidates
+    as friBatchsizeCandidates. The size of an opening for batchsize b only
+    depends on b and on the number of rounds r.
+    '''
+    minfe = np.asarray(minfe, dtype=np.int64)
+    rate = 1.0 / invrate
+    dimensions = _friDimensions(fanin, basedimension, minfe.max(initial=1))
+    domainsizes = [int(d) * invrate for d in dimensions]
+
+    # size of an opening without batching, and
+    # size of opening the batch with batch size 1, per number of rounds
+    authsize = np.array([friAuthSize(n, rate, fsize, 1, fanin, basedimension)
+                         for n in domainsizes], dtype=np.int64)
+    batchopening = np.array([sizeMerkleOpening(n, 1, fsize)
+                             for n in domainsizes], dtype=np.int64)
+
+    candidates = [np.ones(minfe.shape, dtype=np.int64),
+                  np.full(minfe.shape, 2, dtype=np.int64)]
+    for d in dimensions:
+        candidates.append(np.maximum(_ceilDiv(minfe, float(d)), 2))
+    candidates = np.stack(candidates)
+    candidates[candidates > maxbatchsize] = 1
+
+    rounds = friNumRoundsArray(_ceilDiv(minfe, candidates), fanin,
+                               basedimension)
+    sizes = authsize[rounds] + (candidates > 1) * \
+        (batchopening[rounds] + 2 * (candidates - 1) * fsize)
+
+    # the scalar search keeps the largest batch size among the minimal ones
+    minsizes = sizes.min(axis=0)
+    return np.where(sizes == minsizes, candidates, 0).max(axis=0)
+
+
+def friGoodParametersArray(minfe, fsize, invrate,
+                           maxbatchsize=FRI_MAX_BATCHSIZE):
+    '''
+    Vectorized version of friGoodParameters.
+    Returns the arrays (batchsize, fanin, basedimension).
+    '''
+    minfe = np.asarray(minfe, dtype=np.int64)
+    optfanin = np.zeros(minfe.shape, dtype=np.int64)
+    optbasedimension = np.zeros(minfe.shape, dtype=np.int64)
+    optbatchsize = np.zeros(minfe.shape, dtype=np.int64)
+    mingap = np.full(minfe.shape, -1, dtype=np.int64)
+    for fanin in FRI_FANIN_RANGE:
+        for basedimension in FRI_BASEDIMENSION_RANGE:
+            batchsize = friGoodBatchsizeArray(
+                minfe, fsize, invrate, basedimension, fanin, maxbatchsize)
+            mink = _ceilDiv(minfe, batchsize)
+            r = friNumRoundsArray(mink, fanin, basedimension)
+            gap = basedimension * fanin**r - mink
+            better = (mingap == -1) | ((gap >= 0) & (gap <= mingap))
+            mingap = np.where(better, gap, mingap)
+            optfanin[better] = fanin
+            optbasedimension[better] = basedimension
+            optbatchsize[better] = batchsize[better]
+    return (optbatchsize, optfanin, optbasedimension)
+
+
+def makeFRISchemeArray(datasizes, invrate=4, fsize=128,
+                       maxbatchsize=FRI_MAX_BATCHSIZE):
+    '''
+    Vectorized version of makeFRIScheme
+    '''
+    datasizes = _datasizes(datasizes)
+    minfe = _ceilDiv(datasizes, fsize)
+    (batchsize, fanin, basedimension) = friGoodParametersArray(
+        minfe, fsize, invrate, maxbatchsize)
+    mink = _ceilDiv(minfe, batchsize)
+
+    r = np.zeros(minfe.shape, dtype=np.int64)
+    for f in np.unique(fanin):
+        for b in np.unique(basedimension):
+            sel = (fanin == f) & (basedimension == b)
+            if np.any(sel):
+                r[sel] = friNumRoundsArray(mink[sel], int(f), int(b))
+
+    k = basedimension * fanin**r
+    n = invrate * k
+    rate = 1.0 / invrate
+
+    # the remaining quantities only depend on few distinct parameters
+    L = _uniqueApply(lambda n, b, f: friNumRepetitions(rate, n, fsize, b, f),
+                     n, batchsize, fanin)
+    authsize = _uniqueApply(
+        lambda n, b, f, d: friAuthSize(n, rate, fsize, b, f, d),
+        n, batchsize, fanin, basedimension)
+
+    rs = makeRSCodeArray(fsize, k, n)
+
+    final = basedimension * fsize
+    openings = L * authsize
+    roots = r * HASH_SIZE + (batchsize > 1) * HASH_SIZE
+
+    opening_overhead = authsize - batchsize * fsize
+
+    return SchemeArray(
+        com_size=roots + final + openings,
+        code=rs.interleave(batchsize),
+        opening_overhead=opening_overhead
+    )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+'''
+Probability that a single client detects withholding.
+
+The number of samples of a code (see codes.py) is chosen such that the
+samples of all clients together suffice to reconstruct the data. Here,
+we consider one client and an adversary that withholds just enough
+symbols to prevent reconstruction, i.e., w = codeword_len - reception + 1
+symbols (for a tensor code, these are the symbols of a row_dist x col_dist
+subgrid). The client detects the withholding if one of its samples hits
+a withheld symbol. With N = codeword_len and s samples, it fails to do so
+with probability
+- (1 - w/N)^s, if the samples are drawn with replacement, and
+- prod_{i < s} (N - w - i) / (N - i), if they are drawn without replacement.
+All computations are done in log space, so that detection probabilities
+as close to 1 as 1 - 2^{-secpar} do not lose precision.
+
+Usage: python3 withholding.py <data size in MB> [secpar]
+'''
+
+import math
+import sys
+
+import numpy as np
+
+from codes import *
+
+
+def withheldSymbols(code):
+    '''
+    Smallest number of symbols whose withholding prevents reconstruction
+    '''
+    return code.codeword_len - code.reception + 1
+
+
+def logMissProbability(code, samples, replacement=True):
+    '''
+    Natural log of the probability that none of the given number of
+    samples hits a withheld symbol. samples can be a number or an array.
+    Without replacement, this is the cumulative sum of the logs of the
+    factors of the product (computed up to the largest number of samples).
+    '''
+    n = code.codeword_len
+    w = withheldSymbols(code)
+    s = np.asarray(samples, dtype=np.int64)
+    if replacement:
+        return s * math.log1p(-w / n)
+    i = np.arange(min(int(np.max(s, initial=0)), n - w + 1))
+    with np.errstate(divide="ignore"):
+        logs = np.concatenate([[0.0], np.cumsum(np.log1p(-w / (n - i)))])
+    return np.where(s > n - w, -np.inf, logs[np.minimum(s, len(i))])
+
+
+def detectionProbability(code, samples, replacement=True):
+    '''
+    Probability that one of the given number of samples hits a withheld
+    symbol. samples can be a number or an array.
+    '''
+    with np.errstate(divide="ignore"):
+        return -np.expm1(logMissProbability(code, samples, replacement))
+
+
+def _logMissWithoutReplacement(n, w, s):
+    if s > n - w:
+        return -math.inf
+    return math.lgamma(n - w + 1) - math.lgamma(n - w - s + 1) \
+        - math.lgamma(n + 1) + math.lgamma(n - s + 1)
+
+
+def minimalSamples(code, secpar=SECPAR_SOUND, replacement=True):
+    '''
+    Smallest number of samples that detect withholding with
+    probability at least 1 - 2^{-secpar}
+    '''
+    n = code.codeword_len
+    w = withheldSymbols(code)
+    bound = -secpar * math.log(2)
+    if w >= n:
+        return 1
+    if replacement:
+        return max(1, math.ceil(bound / math.log1p(-w / n)))
+    # the log of the miss probability is decreasing in s, and
+    # it is -inf for s = n - w + 1
+    (lo, hi) = (0, n - w + 1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if _logMissWithoutReplacement(n, w, mid) <= bound:
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def detectionComm(scheme, secpar=SECPAR_SOUND, replacement=True):
+    '''
+    Total communication of one client in bits, if it only takes the
+    minimal number of samples to detect withholding
+    '''
+    return scheme.comm_per_query() * minimalSamples(scheme.code, secpar, replacement)
+
+
+def main():
+    from sweep import SCHEMES
+    if len(sys.argv) < 2:
+        print("Usage: python3 withholding.py <data size in MB> [secpar]")
+        sys.exit(-1)
+    datasize = int(float(sys.argv[1]) * 8000000)
+    secpar = int(sys.argv[2]) if len(sys.argv) > 2 else SECPAR_SOUND
+
+    print("detection probability at least 1 - 2^-" + str(secpar))
+    print("{:<12} {:>12} {:>12} {:>10} {:>12} {:>12} {:>12} {:>16} {:>16}".format(
+        "scheme", "N", "withheld", "w / N", "samples", "with repl.", "w/o repl.",
+        "Comm Total [MB]", "Detection [MB]"))
+    for name, makeScheme in SCHEMES.items():
+        scheme = makeScheme(datasize)
+        code = scheme.code
+        w = withheldSymbols(code)
+        print("{:<12} {:>12} {:>12} {:>10.4f} {:>12} {:>12} {:>12} {:>16.2f} {:>16.4f}".format(
+            name, code.codeword_len, w, w / code.codeword_len, scheme.samples(),
+            minimalSamples(code, secpar), minimalSamples(code, secpar, replacement=False),
+            scheme.total_comm() / 8000000, detectionComm(scheme, secpar) / 8000000))
+
+
+if __name__ == "__main__":
+    main()